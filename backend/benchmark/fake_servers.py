@@ -0,0 +1,202 @@
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+#parsed people (the raw_filtered.json shape) that fake PDL records are built from
+SEED_PEOPLE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                "raw_filtered.json")
+#how many records the fake PDL claims to have for any query
+FAKE_PDL_TOTAL = 500
+
+JOB_TITLES = ["Sustainability Coordinator", "Urban Planner", "Environmental Planner", "Community Development Specialist",
+              "Parks and Recreation Director", "Natural Resources Manager", "Public Works Director"]
+BIO = ("- Runs community outreach programs for the county parks department.\n"
+       "- Has secured grant funding for two neighborhood green spaces.\n"
+       "- Limited experience with land use approvals.")
+EMAIL = ("Hi there,\n\nI'm organizing a community garden project nearby and your work on local green spaces stood out. "
+         "Would you have 20 minutes next week to talk about how we might work together?\n\nThanks,\n")
+
+
+@dataclass
+class Behaviour:
+    """How a fake API responds: base latency and jitter (seconds) and the share of requests that fail."""
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 429
+
+    async def delay(self) -> None:
+        seconds = max(0.0, random.gauss(self.latency, self.jitter)) if self.jitter else self.latency
+        if seconds:
+            await asyncio.sleep(seconds)
+
+    def fails(self) -> bool:
+        return self.error_rate > 0 and random.random() < self.error_rate
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _answer(body: dict) -> str:
+    """Canned reply for whichever pipeline stage sent this chat completion."""
+    system = body["messages"][0]["content"]
+    prompt = body["messages"][-1]["content"]
+    #structured stages are told apart by their response schema
+    schema = ((body.get("response_format") or {}).get("json_schema") or {}).get("name")
+    if schema == "DescriptionCheck":
+        return json.dumps({"enough_detail": True, "feedback": ""})
+    if schema == "JobTitles":
+        return json.dumps({"job_titles": JOB_TITLES})
+    if schema == "RelevanceScore":
+        return json.dumps({"score": random.randint(1, 100)})
+    if schema == "RelevanceScores":
+        count = len(re.findall(r"^\s*Candidate \d+:", prompt, re.MULTILINE))
+        return json.dumps({"scores": [{"id": i, "score": random.randint(1, 100)} for i in range(1, count + 1)]})
+    if schema == "CombinedEnrichment":
+        return json.dumps({"bio": BIO, "score": random.randint(1, 100),
+                           "email_draft": None if "(email_draft null)" in prompt else EMAIL})
+    if "email" in system:
+        return EMAIL
+    return BIO
+
+
+def openai_app(behaviour: Behaviour | None = None) -> FastAPI:
+    """Stand-in for POST /v1/chat/completions, plain or streamed."""
+    behaviour = behaviour or Behaviour()
+    app = FastAPI()
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        await behaviour.delay()
+        if behaviour.fails():
+            return JSONResponse({"error": {"message": "fake failure", "type": "server_error"}},
+                                status_code=behaviour.error_status)
+
+        content = _answer(body)
+        usage = {"prompt_tokens": sum(_tokens(m.get("content") or "") for m in body["messages"]),
+                 "completion_tokens": _tokens(content)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        base = {"id": "chatcmpl-fake", "created": int(time.time()), "model": body.get("model", "gpt-4o")}
+
+        if body.get("stream"):
+            async def events():
+                for word in re.findall(r"\S+\s*", content):
+                    chunk = {**base, "object": "chat.completion.chunk",
+                             "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]}
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                if (body.get("stream_options") or {}).get("include_usage"):
+                    yield f"data: {json.dumps({**base, 'object': 'chat.completion.chunk', 'choices': [], 'usage': usage})}\n\n"
+                yield "data: [DONE]\n\n"
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        return {**base, "object": "chat.completion", "usage": usage, "choices": [{
+            "index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}]}
+
+    return app
+
+
+def _seed_records(path: str = SEED_PEOPLE_FILE) -> list[dict]:
+    #turn parsed people back into the PDL fields find_people asks for
+    try:
+        with open(path) as f:
+            people = json.load(f)
+    except (OSError, ValueError):
+        people = []
+    records = []
+    for person in people or [{"name": "sam example", "current_job_title": "urban planner"}]:
+        experience = [{"is_primary": True, "title": {"name": person.get("current_job_title")},
+                       "company": {"name": person.get("company_name"), "industry": person.get("industry")}}]
+        experience += [{"title": {"name": title}, "end_date": "2021-06"} for title, _ in person.get("past_job_title") or []]
+        records.append({
+            "full_name": person.get("name"),
+            "location_name": "charlotte, north carolina, united states",
+            "location_geo": "35.22,-80.84",
+            "skills": person.get("skills") or [],
+            "interests": person.get("interests") or [],
+            "summary": person.get("summary") or "",
+            "personal_emails": [],
+            "phone_numbers": [],
+            "experience": experience,
+        })
+    return records
+
+
+def pdl_app(behaviour: Behaviour | None = None, seed_records: list[dict] | None = None) -> FastAPI:
+    """Stand-in for PDL's POST /v5/person/search with scroll tokens; each query gets its own stable set of people."""
+    behaviour = behaviour or Behaviour()
+    seeds = seed_records or _seed_records()
+    app = FastAPI()
+
+    @app.post("/v5/person/search")
+    async def person_search(request: Request):
+        body = await request.json()
+        await behaviour.delay()
+        if behaviour.fails():
+            return JSONResponse({"status": behaviour.error_status, "error": {"type": "rate_limit",
+                                 "message": "fake failure"}}, status_code=behaviour.error_status)
+
+        #different queries (e.g. title shards) find different people
+        query_offset = zlib.crc32(body["sql"].encode()) % 100000
+        start = int(body.get("scroll_token") or 0)
+        size = min(int(body.get("size", 10)), 100, FAKE_PDL_TOTAL - start)
+        data = []
+        for n in range(start, start + max(size, 0)):
+            record = dict(seeds[n % len(seeds)])
+            record["linkedin_username"] = f"fake-{query_offset}-{n}"
+            data.append(record)
+        next_start = start + len(data)
+        return {"status": 200, "data": data, "total": FAKE_PDL_TOTAL,
+                "scroll_token": str(next_start) if next_start < FAKE_PDL_TOTAL else None}
+
+    return app
+
+
+class FakeServer:
+    """Run an ASGI app with uvicorn on a free local port in a background thread."""
+
+    def __init__(self, app, port: int | None = None, lifespan: str = "off"):
+        self.port = port or _free_port()
+        self._server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning",
+                                                     lifespan=lifespan))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> "FakeServer":
+        self._thread.start()
+        while not self._server.started:
+            if not self._thread.is_alive():
+                raise RuntimeError(f"server on port {self.port} did not start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        self._server.should_exit = True
+        self._thread.join()
+
+    def __enter__(self) -> "FakeServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
@@ -0,0 +1,141 @@
+"""Benchmark POST /api/project/proposal against local stand-ins for OpenAI and PDL.
+
+    python -m backend.benchmark.run --concurrency 1 4 16 --candidates 5 10 --requests 40
+
+Nothing leaves the machine: both APIs are served by backend.benchmark.fake_servers
+with the configured latency, jitter and error rate, and all caches/stores live in
+a throwaway DATA_DIR. Caches start cold unless --warm is given.
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import List
+
+import httpx
+import numpy as np
+
+from backend.benchmark.fake_servers import Behaviour, FakeServer, openai_app, pdl_app
+
+OVERVIEW = ("We are organizing a community-led initiative to transform an abandoned lot into a green space that "
+            "includes a community garden, native plant landscaping, and educational signage about local ecology. "
+            "The goal is to improve food access, promote environmental awareness, and create a safe, beautiful space "
+            "for residents to gather. We are seeking support with land use approvals, funding, volunteer "
+            "coordination, and long-term maintenance partnerships.")
+LOCATION = {"city": "Charlotte", "state": "NC", "country": "USA", "postal_code": "28202"}
+
+
+def payload(i: int, enrichment: str | None = None) -> dict:
+    #a different overview per request so no two requests share LLM cache entries
+    return {"project_overview": f"{OVERVIEW} (request {i})", "location": LOCATION, "enrichment": enrichment}
+
+
+async def drive(api_url: str, requests: int, concurrency: int, enrichment: str | None = None) -> dict:
+    """Send `requests` proposals with at most `concurrency` in flight and summarize the latencies."""
+    latencies: List[float] = []
+    errors = 0
+    sent = iter(range(requests))
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        nonlocal errors
+        for i in sent:
+            start = time.perf_counter()
+            try:
+                response = await client.post("/api/project/proposal", json=payload(i, enrichment))
+                ok = response.status_code == 200 and "people_list" in response.json()
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            errors += not ok
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=api_url, timeout=300, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return summarize(latencies, errors, elapsed)
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if latencies else (0.0, 0.0, 0.0)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(p50 * 1000, 1),
+        "p95_ms": round(p95 * 1000, 1),
+        "p99_ms": round(p99 * 1000, 1),
+        "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+    }
+
+
+def _print_row(row: dict) -> None:
+    print(f"{row['enrichment']:>10} {row['concurrency']:>11} {row['candidates']:>10} {row['requests']:>8} {row['errors']:>6} "
+          f"{row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9} {row['rps']:>7}")
+
+
+def main(argv: List[str] | None = None) -> List[dict]:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--candidates", type=int, nargs="+", default=[5], help="people enriched per proposal")
+    parser.add_argument("--enrichment", nargs="+", default=["separate"], choices=["separate", "combined"],
+                        help="bio/score/email as separate calls or one combined call per person")
+    parser.add_argument("--search-size", type=int, default=25, help="people fetched from PDL per proposal")
+    parser.add_argument("--requests", type=int, default=32, help="proposals per concurrency/candidates pair")
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--openai-latency", type=float, default=0.3)
+    parser.add_argument("--pdl-latency", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.1, help="std dev of both latencies, seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of fake API calls that fail")
+    parser.add_argument("--warm", action="store_true", help="keep the LLM and people caches on")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    openai = FakeServer(openai_app(Behaviour(args.openai_latency, args.jitter, args.error_rate))).start()
+    pdl = FakeServer(pdl_app(Behaviour(args.pdl_latency, args.jitter, args.error_rate))).start()
+
+    #read when the backend modules are imported below
+    os.environ.update({
+        "DATA_DIR": tempfile.mkdtemp(prefix="plantparty-bench-"),
+        "OPENAI_API_KEY": "fake",
+        "OPENAI_BASE_URL": f"{openai.url}/v1",
+        "PDL_API_KEY": "fake",
+        "PDL_BASE_URL": f"{pdl.url}/v5",
+        "PDL_OFFLINE": "0",
+        "PDL_SEARCH_SIZE": str(args.search_size),
+        "LLM_CACHE_ENABLED": "1" if args.warm else "0",
+        "TITLE_REUSE_ENABLED": "1" if args.warm else "0",
+        "PEOPLE_CACHE_TTL_SECONDS": os.environ.get("PEOPLE_CACHE_TTL_SECONDS", "604800") if args.warm else "0",
+    })
+    from backend.internal_logic import prerank
+    from backend.main import app
+
+    api = FakeServer(app, lifespan="on").start()
+    results = []
+    print(f"{'enrichment':>10} {'concurrency':>11} {'candidates':>10} {'requests':>8} {'errors':>6} "
+          f"{'p50_ms':>9} {'p95_ms':>9} {'p99_ms':>9} {'rps':>7}")
+    try:
+        for enrichment in args.enrichment:
+            for candidates in args.candidates:
+                prerank.PRERANK_TOP_K = candidates
+                for concurrency in args.concurrency:
+                    if args.warmup:
+                        asyncio.run(drive(api.url, args.warmup, min(concurrency, args.warmup), enrichment))
+                    row = {"enrichment": enrichment, "concurrency": concurrency, "candidates": candidates,
+                           **asyncio.run(drive(api.url, args.requests, concurrency, enrichment))}
+                    _print_row(row)
+                    results.append(row)
+    finally:
+        api.stop()
+        pdl.stop()
+        openai.stop()
+
+    if args.json:
+        with open(args.json, "w") as out:
+            json.dump(results, out, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
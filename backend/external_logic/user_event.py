@@ -1,42 +1,130 @@
+import asyncio
+import json
+from contextlib import aclosing
+from typing import AsyncIterator
+
 from backend.external_logic.helper import filter_dict
-from backend.internal_logic.check_description import check_description, description_good
-from backend.internal_logic.relevance_score import get_relevance_score, make_score
-from backend.internal_logic.find_people import find_people
-from backend.internal_logic.job_title import get_job_title_list
-from backend.internal_logic.bio_summary import make_bio
-from backend.internal_logic.email_draft import make_email
-from backend.internal_logic.models import ProjectSubmission
-from fastapi import APIRouter
-from fastapi.responses import HTMLResponse
+from backend.internal_logic import jobs, person_store
+from backend.internal_logic.bio_summary import make_bio_async
+from backend.internal_logic.email_draft import make_email_async, stream_email_async
+from backend.internal_logic.models import EmailDraftRequest, Person, ProjectSubmission
+from backend.internal_logic.pipeline import proposal_events, run_proposal
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import HTMLResponse, StreamingResponse
 
 
 # Initialize FastAPI
 router = APIRouter()
 
+#Person fields sent back to the frontend
+PUBLIC_PERSON_FIELDS = ["name","score","email_draft","bio","location","linkedin_url","emails","current_job_title",
+                        "company_name"]
+
+
+def sanitize_person(person: Person | dict) -> dict:
+    if not isinstance(person, dict):
+        person = {field: getattr(person, field) for field in PUBLIC_PERSON_FIELDS}
+    return filter_dict(person, PUBLIC_PERSON_FIELDS)
+
+
+def ndjson_response(events: AsyncIterator[dict], failure: str) -> StreamingResponse:
+    """Stream `events` as newline-delimited JSON, ending with {"type": "done"}.
+
+    The 200 status goes out with the first line, so if `events` fails partway the
+    stream ends with {"type": "error"} instead and the client can tell the two apart.
+    """
+    async def lines():
+        try:
+            async for update in events:
+                yield json.dumps(update) + "\n"
+        except Exception as e:
+            print("stream failed:", repr(e))
+            yield json.dumps({"type": "error", "error": failure}) + "\n"
+            return
+        yield json.dumps({"type": "done"}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @router.post("/project/proposal")
 async def submit_event_location(event: ProjectSubmission):
     print(event.project_overview)
     print(event.location)
     print("hello??")
-    project_overview_feedback = description_good(event.project_overview)
-
-    if project_overview_feedback:
-        print(project_overview_feedback)
-        return {"feedback":project_overview_feedback}
 
-    job_titles = get_job_title_list(event.project_overview)
-    people = find_people(job_titles, location= event.location)
-    summarize_bios = [make_bio(person , event.project_overview ) for person in people]
-    relevancy_scores = [make_score(person, event.project_overview) for person in people]
-    email = [make_email(person, event.project_overview) for person in people]
+    result = await run_proposal(event)
+    if "feedback" in result:
+        print(result["feedback"])
+        return {"feedback": result["feedback"]}
 
-    sanitized_people = [filter_dict(person.__dict__, ["name","score","email_draft","bio","location","linkedin_url","emails"]) for person in people]
+    sanitized_people = [sanitize_person(person) for person in result["people"]]
 
     return {
         "people_list": sanitized_people
     }
 
 
+@router.post("/project/proposal/stream")
+async def stream_event_location(event: ProjectSubmission):
+    """Same pipeline as /project/proposal, streamed as newline-delimited JSON events."""
+    async def updates():
+        #a client that disconnects stops the pipeline's speculative tasks straight away
+        async with aclosing(proposal_events(event, incremental=True)) as events:
+            async for update in events:
+                if update["type"] == "person":
+                    update = {"type": "person", "person": sanitize_person(update["person"])}
+                yield update
+
+    return ndjson_response(updates(), "Proposal failed, please try again.")
+
+
+@router.post("/project/jobs", status_code=202)
+async def create_proposal_job(event: ProjectSubmission):
+    """Queue a proposal for the background workers; poll GET /project/jobs/{job_id} for progress."""
+    try:
+        job_id = await jobs.pool.submit(event)
+    except jobs.QueueFull:
+        raise HTTPException(status_code=503, detail="Too many proposals queued, try again shortly.",
+                            headers={"Retry-After": "10"})
+    return {"job_id": job_id, "status": jobs.QUEUED}
+
+
+@router.get("/project/jobs/{job_id}")
+async def get_proposal_job(job_id: str):
+    job = await asyncio.to_thread(jobs.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job.")
+    result = job["result"] or {}
+    if "people_list" in result:
+        result["people_list"] = [sanitize_person(person) for person in result["people_list"]]
+    return job
+
+@router.post("/project/email")
+async def draft_email(request: EmailDraftRequest):
+    """Draft the outreach email for one person from a proposal (cached, optionally streamed as NDJSON text events)."""
+    person = await asyncio.to_thread(person_store.get_person, request.linkedin_url) if request.linkedin_url else None
+    if person is None and request.name:
+        #people without a LinkedIn profile are never stored, so draft from the profile the client was shown
+        person = Person(name=request.name, linkedin_url=request.linkedin_url, location=request.location,
+                        current_job_title=request.current_job_title, company_name=request.company_name)
+    if person is None:
+        raise HTTPException(status_code=404, detail="Unknown person, submit a proposal first.")
+
+    if request.bio:
+        person.bio = request.bio
+    else:
+        await make_bio_async(person, request.project_overview)
+
+    if request.stream:
+        async def parts():
+            async for text in stream_email_async(person, request.project_overview):
+                yield {"type": "text", "text": text}
+
+        return ndjson_response(parts(), "Email draft failed, please try again.")
+
+    return {"email_draft": await make_email_async(person, request.project_overview)}
+
+
 
 @router.get("/", response_class=HTMLResponse)
 async def serve_hello_page():
@@ -0,0 +1,42 @@
+"""Production server: gunicorn managing uvicorn worker processes.
+
+    gunicorn -c backend/gunicorn.conf.py backend.main:app
+
+or `SERVER_MODE=production python -m backend.main`. Caches, stores, the job queue and
+rate limits are SQLite (WAL) files in DATA_DIR, so all workers share them.
+"""
+import multiprocessing
+import os
+
+from dotenv import load_dotenv
+
+#load variables from .env
+load_dotenv()
+
+bind = os.getenv("BIND", "0.0.0.0:8001")
+#worker processes, each running its own event loop
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = "uvicorn_worker.UvicornWorker"
+#import the app once in the master and fork it; nothing opens files or threads at import
+preload_app = os.getenv("PRELOAD_APP", "1") == "1"
+#seconds an idle keep-alive connection stays open (uvicorn's timeout_keep_alive)
+keepalive = int(os.getenv("KEEPALIVE_SECONDS", "5"))
+#on SIGTERM or reload, seconds workers get to finish requests and put running jobs back in the queue
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT_SECONDS", "30"))
+#a worker that stops checking in this long is replaced
+timeout = int(os.getenv("WORKER_TIMEOUT_SECONDS", "60"))
+#replace each worker after this many requests (0 = never), jittered so they don't all restart at once
+max_requests = int(os.getenv("MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "0"))
+accesslog = os.getenv("ACCESS_LOG", "-")
+
+#provider limits are per account, so the workers draw on one shared budget
+os.environ.setdefault("RATE_LIMIT_SHARED", "1")
+#/metrics sums every worker's counters, whichever worker answers the scrape
+os.environ.setdefault("METRICS_SHARED", "1")
+
+
+def on_starting(server):
+    #counters start from zero with the server, as they would for a single process
+    from backend.internal_logic import metrics
+    metrics.shared.clear()
@@ -0,0 +1,118 @@
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+
+from dotenv import load_dotenv
+
+from backend.internal_logic import storage
+
+#load variables from .env
+load_dotenv()
+
+#append-only NDJSON record of proposals, PDL queries and enriched people
+AUDIT_LOG_ENABLED = os.getenv("AUDIT_LOG_ENABLED", "1") == "1"
+AUDIT_LOG_FILE = os.getenv("AUDIT_LOG_FILE", "audit.ndjson")
+#rotate to audit.ndjson.1, .2, ... once the file passes this size, keeping this many old files
+AUDIT_LOG_MAX_BYTES = int(os.getenv("AUDIT_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+AUDIT_LOG_BACKUPS = int(os.getenv("AUDIT_LOG_BACKUPS", "3"))
+#the writer thread flushes at least this often, or sooner once this many records are waiting
+AUDIT_LOG_FLUSH_SECONDS = float(os.getenv("AUDIT_LOG_FLUSH_SECONDS", "1"))
+AUDIT_LOG_BATCH = int(os.getenv("AUDIT_LOG_BATCH", "200"))
+
+_STOP = object()
+
+
+class AuditLog:
+    """Queue of audit records written out in batches by one background thread.
+
+    record() only puts a dict on the queue, so request handlers never touch the
+    file; the writer appends each batch with one write and rotates by size.
+    """
+
+    def __init__(self, file_name: str = AUDIT_LOG_FILE, max_bytes: int = AUDIT_LOG_MAX_BYTES,
+                 backups: int = AUDIT_LOG_BACKUPS, flush_seconds: float = AUDIT_LOG_FLUSH_SECONDS,
+                 batch: int = AUDIT_LOG_BATCH, enabled: bool = AUDIT_LOG_ENABLED):
+        self.file_name = file_name
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_seconds = flush_seconds
+        self.batch = batch
+        self.enabled = enabled
+        self.dropped = 0
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> str:
+        return os.path.join(storage.DATA_DIR, self.file_name)
+
+    def record(self, kind: str, **fields) -> None:
+        if not self.enabled:
+            return
+        self._start()
+        self._queue.put({"ts": time.time(), "type": kind, **fields})
+
+    def close(self) -> None:
+        """Write out everything queued so far and stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _start(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="audit-log", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch = []
+            try:
+                batch.append(self._queue.get(timeout=self.flush_seconds))
+                while len(batch) < self.batch:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            if _STOP in batch:
+                stopping = True
+                batch = [entry for entry in batch if entry is not _STOP]
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch: list) -> None:
+        lines = "".join(json.dumps(entry, default=str) + "\n" for entry in batch)
+        try:
+            os.makedirs(storage.DATA_DIR, exist_ok=True)
+            path = self.path
+            #every server worker process appends here, so batches and rotations must not interleave
+            with storage.file_lock(f"{path}.lock"):
+                if self.max_bytes and os.path.exists(path) and os.path.getsize(path) + len(lines) > self.max_bytes:
+                    self._rotate(path)
+                with open(path, "a", encoding="utf-8") as out:
+                    out.write(lines)
+        except OSError as e:
+            #losing audit lines must never take the server down
+            self.dropped += len(batch)
+            print("audit log write failed:", e)
+
+    def _rotate(self, path: str) -> None:
+        if self.backups <= 0:
+            os.remove(path)
+            return
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{path}.{i}"):
+                os.replace(f"{path}.{i}", f"{path}.{i + 1}")
+        os.replace(path, f"{path}.1")
+
+
+audit = AuditLog()
+atexit.register(audit.close)
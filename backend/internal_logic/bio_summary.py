@@ -1,5 +1,6 @@
 from backend.internal_logic.models import Person
-from openai import OpenAI
+from backend.internal_logic.llm_client import acomplete, complete
+from backend.internal_logic.prompt_context import person_context
 
 
 def make_bio(person: Person, event_summary: str) -> str:
@@ -7,12 +8,21 @@ def make_bio(person: Person, event_summary: str) -> str:
     return person.bio
 
 
+async def make_bio_async(person: Person, event_summary: str) -> str:
+    person.bio = await bio_async(person, event_summary)
+    return person.bio
+
+
 def bio(person: Person, event_summary: str) -> str:
-    client = OpenAI()
+    return complete("bio", _messages(person, event_summary), model="gpt-4o", temperature=.35, max_tokens=800)
+
 
-    completion = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
+async def bio_async(person: Person, event_summary: str) -> str:
+    return await acomplete("bio", _messages(person, event_summary), model="gpt-4o", temperature=.35, max_tokens=800)
+
+
+def _messages(person: Person, event_summary: str) -> list[dict]:
+    return [
             {
                 "role": "system",
                 "content": """You are an agent tasked with taking in information about a person who could help the user with task.
@@ -34,33 +44,14 @@ def bio(person: Person, event_summary: str) -> str:
             
             Here is a candidate information who might be helpful create 6 short bullet point summary of their experience and also include information that might be relevant to the project:
             
-            Name: {person.name}
-            
-            Current Job Title : {person.current_job_title}
-            
-            Company Name : {person.company_name}
-            
-            Industry : {person.industry}
-            
-            Skills : {person.skills}
-            
-            interests : {person.interests}
-            
-            linkedIn bio : {person.summary}
-            
-            past_job_title(s) : {person.past_job_title}
+            {person_context(person, event_summary, 'bio')}
             
             
             
             
             Please create a bio for this person.
             """
-            }],
-        temperature=.35,
-        max_tokens=800
-    )
-
-    return completion.choices[0].message.content
+            }]
 
 
 if __name__ == "__main__":
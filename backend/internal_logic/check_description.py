@@ -1,60 +1,118 @@
-from logging import warning
-from typing import List
-from openai import OpenAI
+from collections import Counter
 import os
+import re
+
 from dotenv import load_dotenv
-import ast
 
-#load variables from .env
+from backend.internal_logic import metrics
+from backend.internal_logic.llm_client import acomplete_structured, complete_structured
+from backend.internal_logic.models import DescriptionCheck
 
+#load variables from .env
 load_dotenv()
 
-try:
-    openai_api_key = os.getenv("OPENAI_API_KEY")
-    client = OpenAI(api_key=openai_api_key)
-except Exception as e:
-    print(e)
-    openai_api_key = None
-    client = None
-    warning("NO ENV OPENAI_API_KEY found!!")
-
-def description_good(event_summary: str) -> list[str] | None:
-    result = check_description(event_summary)
-    return None if "1" in result else result
-
-
-def check_description(event_summary: str)-> List[str]:
-
+#local fast path: summaries at least this long, with enough of the signals below, skip the LLM
+DESCRIPTION_MIN_WORDS = int(os.getenv("DESCRIPTION_MIN_WORDS", "40"))
+DESCRIPTION_MIN_SIGNALS = int(os.getenv("DESCRIPTION_MIN_SIGNALS", "2"))
+
+GOAL_WORDS = frozenset(
+    "aim aims build create develop establish grow host improve install launch organize organizing plant promote"
+    " provide reduce restore start transform".split()
+)
+LOCATION_WORDS = frozenset(
+    "campus city community county district downtown lot neighborhood park residents rooftop school street town"
+    " urban village".split()
+)
+NEED_WORDS = frozenset(
+    "approval approvals donations funding grant grants partner partners partnership partnerships permit permits"
+    " sponsor sponsors sponsorship volunteer volunteers".split()
+)
+#"in Charlotte", "at Lincoln Park"
+_PLACE_NAME = re.compile(r"\b(?:in|at|near)\s+(?:the\s+)?[A-Z][a-z]+")
+_WORD = re.compile(r"[a-z']+")
+
+#how often the heuristic answered vs. the LLM ("heuristic" / "llm")
+description_stats = Counter()
+DESCRIPTION_CHECKS = metrics.Counter("description_checks_total", "Description checks by who answered.", ("path",),
+                                     source=lambda: {(path,): count for path, count in description_stats.items()})
+
+
+def quick_check(event_summary: str) -> bool:
+    """True when the summary is clearly detailed enough that the LLM check would only confirm it.
+
+    Never rejects: anything borderline goes to the LLM for feedback.
+    """
+    words = _WORD.findall(event_summary.lower())
+    if len(words) < DESCRIPTION_MIN_WORDS:
+        return False
+    vocabulary = set(words)
+    signals = sum((
+        bool(vocabulary & GOAL_WORDS),
+        bool(vocabulary & LOCATION_WORDS) or bool(_PLACE_NAME.search(event_summary)),
+        bool(vocabulary & NEED_WORDS),
+    ))
+    return signals >= DESCRIPTION_MIN_SIGNALS
+
+
+def description_good(event_summary: str) -> str | None:
+    """None if the summary is detailed enough, otherwise feedback on how to improve it."""
+    if quick_check(event_summary):
+        description_stats["heuristic"] += 1
+        return None
+    description_stats["llm"] += 1
+    return _feedback(check_description(event_summary))
+
+
+async def description_good_async(event_summary: str) -> str | None:
+    if quick_check(event_summary):
+        description_stats["heuristic"] += 1
+        return None
+    description_stats["llm"] += 1
+    return _feedback(await check_description_async(event_summary))
+
+
+def _feedback(result: DescriptionCheck | None) -> str | None:
+    #an unusable answer lets the summary through, like the prompt's "err on the side of being helpful"
+    if result is None or result.enough_detail or not result.feedback.strip():
+        return None
+    return result.feedback.strip()
+
+
+def check_description(event_summary: str) -> DescriptionCheck | None:
+    return complete_structured("check_description", _messages(event_summary), DescriptionCheck, model="gpt-4o",
+                               temperature=0.6)
+
+
+async def check_description_async(event_summary: str) -> DescriptionCheck | None:
+    return await acomplete_structured("check_description", _messages(event_summary), DescriptionCheck,
+                                      model="gpt-4o", temperature=0.6)
+
+
+def _messages(event_summary: str) -> list[dict]:
     prompt = f"""
         Given the following project summary, determine whether it provides *enough general detail* to identify relevant people (e.g., government officials, nonprofit leaders, or community stakeholders) who could support or enable a sustainability-related community project.
 
         Project Summary:
         {event_summary}
 
-        If the summary includes at least a general idea of the project’s goals, some context about the location or community, or mentions any needs (like funding, partnerships, or permissions), return **"1"**.
+        If the summary includes at least a general idea of the project’s goals, some context about the location or community, or mentions any needs (like funding, partnerships, or permissions), set enough_detail to true and leave feedback empty.
 
-        Otherwise, return a *friendly and constructive message* explaining how the summary could be improved — for example:
+        Otherwise, set enough_detail to false and put a *friendly and constructive message* in feedback explaining how the summary could be improved — for example:
         - It doesn’t mention what the project is trying to achieve
         - There’s no sense of where it takes place or who it helps
         - It doesn’t mention any kind of support needed (like funding or volunteers)
 
-        Err on the side of being helpful — if there’s *some* useful info that could guide outreach, assume it's enough and return **"1"**.
+        Err on the side of being helpful — if there’s *some* useful info that could guide outreach, assume it's enough and set enough_detail to true.
         """
 
-    response = client.chat.completions.create(model="gpt-4o",
-    messages=[
+    return [
         {"role": "system", "content": "You help check project summaries for sustainability-related community projects."},
         {"role": "user", "content": prompt}
-    ],
-    temperature=0.6)
-
-    #plain text response from gippity
-    content = response.choices[0].message.content
-
-    return content
+    ]
 
 
-#test 1
-print(check_description("Starting a green initiative. Need help."))
+if __name__ == "__main__":
+    #test 1
+    print(check_description("Starting a green initiative. Need help."))
 
 
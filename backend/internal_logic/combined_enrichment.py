@@ -0,0 +1,67 @@
+from backend.internal_logic.llm_client import acomplete, complete, parse_output, response_format
+from backend.internal_logic.models import CombinedEnrichment, Person
+from backend.internal_logic.prompt_context import person_context
+
+
+def make_combined(person: Person, event_summary: str, with_email: bool = True) -> Person:
+    """Fill in bio, score and (optionally) email draft from one JSON completion.
+
+    Returns the person; fields the model got wrong are left as None so the
+    caller can fill them the usual way.
+    """
+    content = complete("combined_enrichment", _messages(person, event_summary, with_email), model="gpt-4o",
+                       temperature=.35, max_tokens=1200 if with_email else 500,
+                       response_format=response_format(CombinedEnrichment))
+    return _apply(person, parse_combined(content))
+
+
+async def make_combined_async(person: Person, event_summary: str, with_email: bool = True) -> Person:
+    content = await acomplete("combined_enrichment", _messages(person, event_summary, with_email), model="gpt-4o",
+                              temperature=.35, max_tokens=1200 if with_email else 500,
+                              response_format=response_format(CombinedEnrichment))
+    return _apply(person, parse_combined(content))
+
+
+def parse_combined(content: str) -> dict:
+    """bio / score / email_draft from the model's JSON, leaving out anything missing or malformed."""
+    #no retry: whatever is missing is filled by the separate stages
+    result = parse_output("combined_enrichment", content, CombinedEnrichment)
+    return result.model_dump(exclude_none=True) if result else {}
+
+
+def _apply(person: Person, fields: dict) -> Person:
+    person.bio = fields.get("bio")
+    person.score = fields.get("score")
+    person.email_draft = fields.get("email_draft", person.email_draft)
+    return person
+
+
+def _messages(person: Person, event_summary: str, with_email: bool) -> list[dict]:
+    email_note = "" if with_email else " (email_draft null)"
+    email_task = """
+        3. email_draft: a concise, professional email inviting this person to discuss or collaborate on the project.
+           Greet them by name, briefly describe the project and its goals, say why their background makes them
+           a good fit, suggest a short call or meeting, and thank them. Leave the sender's name blank.""" if with_email else ""
+    prompt = f"""
+        A user wants to make a project:
+
+        {event_summary}
+
+        Here is a candidate who might be able to help:
+
+        {person_context(person, event_summary, 'combined_enrichment')}
+
+        Write:
+        1. bio: 3 or fewer short bullet points about this person that matter for the project, positive and
+           negative if possible, each saying in up to two sentences why it is important to the project.
+           Do not say the name.
+        2. score: one integer from 1 (not relevant at all) to 100 (extremely relevant and likely to help) for
+           how useful this person would be in supporting or enabling the project.{email_task}
+
+        Answer with the bio, score and email_draft fields{email_note}.
+        """
+
+    return [
+        {"role": "system", "content": "You help find sponsors for sustainability-related community projects."},
+        {"role": "user", "content": prompt}
+    ]
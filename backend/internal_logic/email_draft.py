@@ -1,17 +1,38 @@
+from typing import AsyncIterator
+
+from backend.internal_logic.llm_client import acomplete, astream_complete, complete
 from backend.internal_logic.models import Person
-from openai import OpenAI
+from backend.internal_logic.prompt_context import person_context
 
 def make_email(person: Person, event_summery: str)->str:
     person.email_draft = bio(person , event_summery)
     return person.email_draft
 
 
+async def make_email_async(person: Person, event_summery: str) -> str:
+    person.email_draft = await bio_async(person, event_summery)
+    return person.email_draft
+
+
 def bio(person: Person, event_summary: str) -> str:
-    client = OpenAI()
+    return complete("email_draft", _messages(person, event_summary), model="gpt-4o", temperature=.35, max_tokens=800)
+
 
-    completion = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
+async def bio_async(person: Person, event_summary: str) -> str:
+    return await acomplete("email_draft", _messages(person, event_summary), model="gpt-4o", temperature=.35, max_tokens=800)
+
+
+async def stream_email_async(person: Person, event_summary: str) -> AsyncIterator[str]:
+    """Yield the email draft as it is written, then store the full text on the person."""
+    parts = []
+    async for part in astream_complete("email_draft", _messages(person, event_summary), model="gpt-4o", temperature=.35, max_tokens=800):
+        parts.append(part)
+        yield part
+    person.email_draft = "".join(parts)
+
+
+def _messages(person: Person, event_summary: str) -> list[dict]:
+    return [
             {
             "role": "system",
             "content": """You are an agent tasked with writing a concise, professional email to the person in question, inviting them to discuss or collaborate on a forthcoming event. You will be given the event details and information about the person. Please craft an email that:
@@ -32,20 +53,8 @@ def bio(person: Person, event_summary: str) -> str:
 
             Here is the candidate information who might be helpful:
 
-            Name: {person.name}
+            {person_context(person, event_summary, 'email_draft')}
             Summary: {person.bio}
-            Current Job Title: {person.current_job_title}
-            Company Name: {person.company_name}
-            Industry: {person.industry}
-            Skills: {person.skills}
-            Interests: {person.interests}
-            LinkedIn Bio: {person.summary}
-            Past job title(s): {person.past_job_title}
 
             Please create an email to this person."""
-        }],
-            temperature=.35,
-            max_tokens=800
-    )
-
-    return completion.choices[0].message.content
\ No newline at end of file
+        }]
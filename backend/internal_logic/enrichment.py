@@ -0,0 +1,106 @@
+import asyncio
+import os
+from typing import AsyncIterator, List
+from dotenv import load_dotenv
+
+from backend.internal_logic.bio_summary import make_bio_async
+from backend.internal_logic.combined_enrichment import make_combined_async
+from backend.internal_logic.email_draft import make_email_async
+from backend.internal_logic.models import Person, person_key
+from backend.internal_logic.relevance_score import make_score_async, make_scores_async
+from backend.internal_logic.single_flight import SingleFlight, fingerprint
+
+#load variables from .env
+load_dotenv()
+
+#max number of people being enriched at the same time
+ENRICH_CONCURRENCY = int(os.getenv("ENRICH_CONCURRENCY", "5"))
+#score everyone in one batched request instead of one request per person
+ENRICH_BATCH_SCORES = os.getenv("ENRICH_BATCH_SCORES", "1") == "1"
+#draft emails for everyone up front instead of on demand (POST /api/project/email)
+ENRICH_EAGER_EMAILS = os.getenv("ENRICH_EAGER_EMAILS", "0") == "1"
+#"separate": a bio call, then score and email calls; "combined": one JSON call per person
+#(a proposal can pick its own with ProjectSubmission.enrichment)
+ENRICH_MODE = os.getenv("ENRICH_MODE", "separate")
+
+#the same person enriched for the same project at the same time is only done once
+_in_flight = SingleFlight("enrichment")
+
+
+async def enrich_person(person: Person, event_summary: str, semaphore: asyncio.Semaphore,
+                        with_email: bool = ENRICH_EAGER_EMAILS, mode: str | None = None) -> Person:
+    """Fill in bio, score and (optionally) email draft for one person; score and email both need the bio."""
+    mode = mode or ENRICH_MODE
+    key = (fingerprint(event_summary), person_key(person), with_email, mode)
+    done = await _in_flight.run(key, lambda: _enrich_person(person, event_summary, semaphore, with_email, mode))
+    if done is not person:
+        person.bio, person.score, person.email_draft = done.bio, done.score, done.email_draft
+    return person
+
+
+async def _enrich_person(person: Person, event_summary: str, semaphore: asyncio.Semaphore, with_email: bool,
+                         mode: str) -> Person:
+    async with semaphore:
+        if mode == "combined":
+            await make_combined_async(person, event_summary, with_email)
+        #separate calls for everything (or whatever the combined answer left out)
+        if person.bio is None:
+            await make_bio_async(person, event_summary)
+        await asyncio.gather(
+            *([make_score_async(person, event_summary)] if person.score is None else []),
+            *([make_email_async(person, event_summary)] if with_email and person.email_draft is None else []),
+        )
+    return person
+
+
+async def enrich_people(people: List[Person], event_summary: str, concurrency: int | None = None,
+                        batch_scores: bool = ENRICH_BATCH_SCORES,
+                        with_email: bool = ENRICH_EAGER_EMAILS, mode: str | None = None) -> List[Person]:
+    """Enrich every person concurrently, with at most `concurrency` people in flight.
+
+    With batch_scores, emails still start as soon as each bio is ready while the
+    scores for everyone are requested together once all bios are in. The combined
+    mode already scores each person in its one call.
+    """
+    mode = mode or ENRICH_MODE
+    semaphore = asyncio.Semaphore(concurrency or ENRICH_CONCURRENCY)
+    if not batch_scores or mode == "combined":
+        await asyncio.gather(*(enrich_person(person, event_summary, semaphore, with_email, mode) for person in people))
+        return people
+
+    async def bio(person: Person) -> None:
+        async with semaphore:
+            await make_bio_async(person, event_summary)
+
+    async def email(person: Person, bio_task: asyncio.Future) -> None:
+        await bio_task
+        async with semaphore:
+            await make_email_async(person, event_summary)
+
+    async def scores() -> None:
+        await asyncio.gather(*bio_tasks)
+        await make_scores_async(people, event_summary)
+
+    bio_tasks = [asyncio.ensure_future(bio(person)) for person in people]
+    emails = [email(person, task) for person, task in zip(people, bio_tasks)] if with_email else []
+    try:
+        await asyncio.gather(scores(), *emails)
+    finally:
+        for task in bio_tasks:
+            task.cancel()
+    return people
+
+
+async def iter_enriched(people: List[Person], event_summary: str, concurrency: int | None = None,
+                        with_email: bool = ENRICH_EAGER_EMAILS, mode: str | None = None) -> AsyncIterator[Person]:
+    """Yield each person as soon as their own enrichment is done."""
+    semaphore = asyncio.Semaphore(concurrency or ENRICH_CONCURRENCY)
+    tasks = [asyncio.ensure_future(enrich_person(person, event_summary, semaphore, with_email, mode))
+             for person in people]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        #client went away mid-stream
+        for task in tasks:
+            task.cancel()
@@ -1,96 +1,289 @@
 from logging import warning
-from typing import List, Dict
+from typing import AsyncIterator, List, Dict
+import asyncio
 import json
-from dataclasses import asdict
-from datetime import datetime
-from peopledatalabs import PDLPY
+from dataclasses import replace
+from datetime import date
 from dotenv import load_dotenv
 import os
 from typing import List
-import sqlite3
-from backend.internal_logic.models import Person
+import numpy as np
+from backend.internal_logic import metrics, person_store, rate_limit
+from backend.internal_logic.audit_log import audit
+from backend.internal_logic.models import Person, person_key
+from backend.internal_logic.single_flight import SingleFlight
 
 #get key
 load_dotenv()
 pdl_api_key = os.getenv("PDL_API_KEY")
-try:
-    CLIENT = PDLPY(api_key=pdl_api_key)
-except:
-    CLIENT = None
+#answer searches from the local person store only, never calling PDL
+PDL_OFFLINE = os.getenv("PDL_OFFLINE", "0") == "1"
+#candidates fetched per search, the pre-ranker picks the few worth enriching
+PDL_SEARCH_SIZE = int(os.getenv("PDL_SEARCH_SIZE", "25"))
+#records per PDL page (max 100) and how many pages may be in flight at once
+PDL_PAGE_SIZE = min(int(os.getenv("PDL_PAGE_SIZE", "10")), 100)
+PDL_CONCURRENCY = int(os.getenv("PDL_CONCURRENCY", "3"))
+#how tightly searches follow the submitted location: city (postal code or city+state), state or country
+PDL_LOCATION_SCOPE = os.getenv("PDL_LOCATION_SCOPE", "city").lower()
+#offline searches with coordinates return stored people within this distance
+PEOPLE_SEARCH_RADIUS_KM = float(os.getenv("PEOPLE_SEARCH_RADIUS_KM", "50"))
+#PDL person search endpoint and how long to wait on it
+PDL_BASE_URL = os.getenv("PDL_BASE_URL", "https://api.peopledatalabs.com/v5")
+PDL_TIMEOUT_SECONDS = float(os.getenv("PDL_TIMEOUT_SECONDS", "30"))
+#past jobs that ended within this many days are kept on the person
+PAST_JOB_DAYS = 3650
+
+#only the fields parse_people reads, PDL sends every field of the profile otherwise
+PDL_FIELDS = ",".join([
+    "full_name", "location_name", "location_geo", "linkedin_username",
+    "skills", "interests", "summary", "personal_emails", "phone_numbers",
+    "experience.is_primary", "experience.end_date", "experience.title.name",
+    "experience.company.name", "experience.company.industry",
+])
+
+PDL_REQUESTS = metrics.Counter("pdl_requests_total", "PDL person searches by response status.", ("status",))
+PDL_CREDITS = metrics.Counter("pdl_credits_total", "PDL credits used (one per person record returned).")
+
+class PDLSearchError(Exception):
+    pass
+
+
+#identical searches running at the same time share one set of PDL calls
+_in_flight = SingleFlight("pdl_search")
+
+#pooled HTTP client, created on first search
+CLIENT = None
+
+
+def get_client():
+    global CLIENT
+    if CLIENT is None:
+        import httpx
+        CLIENT = httpx.Client(
+            base_url=PDL_BASE_URL,
+            headers={"X-Api-Key": pdl_api_key or ""},
+            timeout=PDL_TIMEOUT_SECONDS,
+            limits=httpx.Limits(max_connections=PDL_CONCURRENCY * 2, max_keepalive_connections=PDL_CONCURRENCY * 2),
+        )
+    return CLIENT
+
+
+def close_client() -> None:
+    global CLIENT
+    if CLIENT is not None:
+        CLIENT.close()
+        CLIENT = None
+
+
+def _post(path: str, body: Dict) -> Dict:
+    response = get_client().post(path, json=body)
+    if response.status_code in rate_limit.RETRY_STATUSES:
+        #429/5xx are retried by the rate limiter, other errors come back as PDL's JSON body
+        response.raise_for_status()
+    return response.json()
+
+
+def _search_body(sql_query: str, size: int, scroll_token: str | None) -> Dict:
+    #only PDL_FIELDS are asked for (the peopledatalabs SDK drops data_include)
+    body = {"sql": sql_query, "size": size, "data_include": PDL_FIELDS}
+    if scroll_token:
+        body["scroll_token"] = scroll_token
+    return body
+
+
+def _search(sql_query: str, size: int, scroll_token: str | None = None) -> Dict:
+    """POST /person/search, waiting for the PDL rate limit in this thread."""
+    body = _search_body(sql_query, size, scroll_token)
+    with metrics.span("pdl.request"):
+        response = rate_limit.limiter("pdl").run_sync(lambda: _post("/person/search", body))
+    _record_search(sql_query, size, scroll_token, response)
+    return response
+
+
+async def _search_async(sql_query: str, size: int, scroll_token: str | None = None) -> Dict:
+    """Async `_search`: rate-limit waits and backoff sleep on the loop, only the HTTP call takes a thread."""
+    body = _search_body(sql_query, size, scroll_token)
+    with metrics.span("pdl.request"):
+        response = await rate_limit.limiter("pdl").run(lambda: asyncio.to_thread(_post, "/person/search", body))
+    _record_search(sql_query, size, scroll_token, response)
+    return response
+
+
+def _record_search(sql_query: str, size: int, scroll_token: str | None, response: Dict) -> None:
+    PDL_REQUESTS.inc(status=response.get("status"))
+    PDL_CREDITS.inc(len(response.get("data") or []))
+    audit.record("pdl_query", sql=sql_query, size=size, scrolled=bool(scroll_token), status=response.get("status"),
+                 returned=len(response.get("data") or []), total=response.get("total"))
+
+
+US_STATES = {
+    "al": "alabama", "ak": "alaska", "az": "arizona", "ar": "arkansas", "ca": "california", "co": "colorado",
+    "ct": "connecticut", "de": "delaware", "dc": "district of columbia", "fl": "florida", "ga": "georgia",
+    "hi": "hawaii", "id": "idaho", "il": "illinois", "in": "indiana", "ia": "iowa", "ks": "kansas",
+    "ky": "kentucky", "la": "louisiana", "me": "maine", "md": "maryland", "ma": "massachusetts",
+    "mi": "michigan", "mn": "minnesota", "ms": "mississippi", "mo": "missouri", "mt": "montana",
+    "ne": "nebraska", "nv": "nevada", "nh": "new hampshire", "nj": "new jersey", "nm": "new mexico",
+    "ny": "new york", "nc": "north carolina", "nd": "north dakota", "oh": "ohio", "ok": "oklahoma",
+    "or": "oregon", "pa": "pennsylvania", "ri": "rhode island", "sc": "south carolina", "sd": "south dakota",
+    "tn": "tennessee", "tx": "texas", "ut": "utah", "vt": "vermont", "va": "virginia", "wa": "washington",
+    "wv": "west virginia", "wi": "wisconsin", "wy": "wyoming", "pr": "puerto rico",
+}
+COUNTRY_ALIASES = {"usa": "united states", "us": "united states", "u.s.": "united states",
+                   "u.s.a.": "united states", "united states of america": "united states"}
 
-#Helper func
-from typing import List
-
-from typing import List
 
-from typing import List
-
-from typing import List
+def _sql_str(value: str) -> str:
+    # Properly escape single quotes by doubling them
+    return "'" + value.replace("'", "''") + "'"
 
 
+#Helper func
 def build_sql_query(job_titles: List[str], location) -> str:
     if not job_titles:
         raise ValueError("Job title list cannot be empty.")
 
     # Safely format job titles using SQL escaping
-    safe_titles = []
-    for title in job_titles:
-        # Properly escape single quotes by doubling them
-        escaped_title = title.replace("'", "''")
-        safe_titles.append(f"'{escaped_title}'")
-
-    job_titles_str = ", ".join(safe_titles)
-
-    # Format location_name in the format "locality, region, country"
-    # From the docs: location_name String - The location of the person's current address
-    location_name = f"{location.city}, {location.state}, {location.country}"
-    safe_location_name = location_name.replace("'", "''").lower()
-
-    # Based on the docs, location_postal_code is the correct field name
-    safe_postal_code = location.postal_code.replace("'", "''")
-
+    job_titles_str = ", ".join(_sql_str(title) for title in job_titles)
+
+    # PDL stores lowercase full names: locality "charlotte", region "north carolina", country "united states"
+    country = (location.country or "united states").strip().lower()
+    country = COUNTRY_ALIASES.get(country, country)
+    region = (location.state or "").strip().lower()
+    region = US_STATES.get(region, region) if country == "united states" else region
+    locality = (location.city or "").strip().lower()
+
+    conditions = [f"location_country={_sql_str(country)}"]
+    #PDL_LOCATION_SCOPE=state/country widens the search when a town has too few people
+    area = []
+    if locality and PDL_LOCATION_SCOPE == "city":
+        area.append(f"location_locality={_sql_str(locality)}")
+    if region and PDL_LOCATION_SCOPE in ("city", "state"):
+        area.append(f"location_region={_sql_str(region)}")
+    if area:
+        area_sql = " AND ".join(area)
+        # Based on the docs, location_postal_code is the correct field name
+        if location.postal_code and PDL_LOCATION_SCOPE == "city":
+            area_sql = f"(location_postal_code={_sql_str(location.postal_code.strip())} OR ({area_sql}))"
+        conditions.append(area_sql)
+    conditions.append(f"job_title IN ({job_titles_str})")
+
+    where = "\n    AND ".join(conditions)
     query = f"""
     SELECT * FROM person
-    WHERE location_country='united states'
-    AND job_title IN ({job_titles_str});
+    WHERE {where};
     """
     return query
 
 #Helper func
 def days_since(date_str: str) -> int:
-    if not date_str:
-        return None
+    return days_since_many([date_str])[0]
+
+
+def days_since_many(dates: List[str | None]) -> List[int | None]:
+    """Days since each PDL date ("2019", "2019-05" or "2019-05-17"), parsed together as one array."""
+    if not dates:
+        return []
+    try:
+        parsed = np.array(dates, dtype="datetime64[D]")
+    except ValueError:
+        #one malformed date, fall back to parsing them one by one
+        parsed = np.array([_parse_date(value) for value in dates], dtype="datetime64[D]")
+    days = np.datetime64(date.today(), "D") - parsed
+    return [None if missing else int(value) for value, missing in zip(days.astype(np.int64), np.isnat(parsed))]
+
+
+def _parse_date(value: str | None) -> np.datetime64:
     try:
-        end_date = datetime.strptime(date_str, "%Y-%m-%d")
-        return (datetime.now() - end_date).days
-    except Exception:
+        return np.datetime64(value or "NaT", "D")
+    except ValueError:
+        return np.datetime64("NaT")
+
+def _cached_people(sql_query: str, size: int, job_titles: List[str], location, offline: bool) -> List[Person] | None:
+    #same query seen recently (or any time, when offline) -> no PDL call
+    cached = person_store.get_cached_query(sql_query, size, max_age=None if offline else person_store.PEOPLE_CACHE_TTL_SECONDS)
+    if cached is not None:
+        print(f"Using {len(cached)} cached records for this query.")
+        return cached
+    if offline:
+        if location.coordinates:
+            return person_store.nearest(location.coordinates.latitude, location.coordinates.longitude,
+                                        PEOPLE_SEARCH_RADIUS_KM, limit=size, job_titles=job_titles)
+        return person_store.find_local(job_titles, city=location.city, limit=size)
+    return None
+
+
+def parse_people(records: List[Dict]) -> List[Person]:
+    """Decode a page of PDL records in one pass; past-job end dates are aged together at the end."""
+    persons = []
+    past_jobs = []  # (index into persons, title, end_date)
+    for person in records:
+        current_job = None
+        for job in person.get("experience") or ():
+            if job.get("is_primary"):
+                current_job = current_job or job
+            elif job.get("end_date"):
+                past_jobs.append((len(persons), (job.get("title") or {}).get("name") or "", job["end_date"]))
+        title = (current_job or {}).get("title") or {}
+        company = (current_job or {}).get("company") or {}
+
+        persons.append(Person(
+            name=person.get("full_name") or "",
+            location=person.get("location_name") or "",
+            current_job_title=title.get("name") or "",
+            company_name=company.get("name") or "",
+            industry=company.get("industry") or "",
+            skills=person.get("skills") or [],
+            interests=person.get("interests") or [],
+            summary=person.get("summary") or "",
+            emails=person.get("personal_emails") or [],
+            phone_numbers=person.get("phone_numbers") or [],
+            #no placeholder URL: people without a profile must not collide on one key
+            linkedin_url=f"https://linkedin.com/in/{username}" if (username := person.get("linkedin_username")) else None,
+            coordinates=_parse_geo(person.get("location_geo")),
+        ))
+
+    ages = days_since_many([end_date for _, _, end_date in past_jobs])
+    for (index, title, _), days in zip(past_jobs, ages):
+        if days is not None and days <= PAST_JOB_DAYS:
+            persons[index].past_job_title.append((title, days))
+    return persons
+
+
+def parse_person(person: Dict) -> Person:
+    return parse_people([person])[0]
+
+
+def _parse_geo(location_geo: str | None) -> tuple[float, float] | None:
+    #PDL sends "lat,long" strings
+    try:
+        latitude, longitude = (float(part) for part in location_geo.split(","))
+        return latitude, longitude
+    except (AttributeError, ValueError):
         return None
 
-def find_people(job_titles: List[str], location: str):
+
+def find_people(job_titles: List[str], location: str, offline: bool = PDL_OFFLINE):
     sql_query = build_sql_query(job_titles, location)
     print(sql_query)
 
-    params = {
-        'sql': sql_query,
-        'size': 2,  #Change to increase number of results
-        'pretty': True
-    }
+    size = PDL_SEARCH_SIZE
+
+    cached = _cached_people(sql_query, size, job_titles, location, offline)
+    if cached is not None:
+        return cached
 
     try:
-        response = CLIENT.person.search(**params).json()
+        response = _search(sql_query, size)
     except Exception as e:
         print("API call failed:", e)
         return []
-    
-    persons = []
 
     if response.get("status") != 200:
         print("error with PDL request:")
         print(json.dumps(response, indent=2))  # Show full error
         if "error" in response:
             print(response)
-            print(response.text)
-            if "sql" in response["error"].lower():
+            if "sql" in str(response["error"]).lower():
                 print("possible issue with the SQL syntax.")
         return []
 
@@ -98,50 +291,118 @@ def find_people(job_titles: List[str], location: str):
         print("no data field in PDL response.")
         return []
 
-    for person in response["data"]:
-        experience = person.get("experience", [])
-        current_job = next((job for job in experience if job.get("is_primary")), None)
-
-        relevant_past_jobs = []
-        for job in experience:
-            if job.get("is_primary", False):
-                continue
-            days = days_since(job.get("end_date"))
-            if days is not None and days <= 3650:
-                title = job.get("title", {}).get("name", "")
-                relevant_past_jobs.append((title, days))
-
-        info = {
-            "name": person.get("full_name", ""),
-            "location": person.get("location_name", ""),
-            "current_job_title": current_job.get("title", {}).get("name", "") if current_job else "",
-            "company_name": current_job.get("company", {}).get("name", "") if current_job else "",
-            "industry": current_job.get("company", {}).get("industry", "") if current_job else "",
-            "skills": person.get("skills", []),
-            "interests": person.get("interests", []),
-            "summary": person.get("summary", ""),
-            "emails": person.get("personal_emails", []),
-            "phone_numbers": person.get("phone_numbers", []),
-            "linkedin_url": f"https://linkedin.com/in/{person.get('linkedin_username', '')}",
-            "past_job_title": relevant_past_jobs
-        }
-
-        persons.append(Person(**info))                
-
-
-        #Optional: Save full raw data to file
-        with open("raw_filtered.json", "w") as out:
-            json.dump([asdict(p) for p in persons], out, indent=2)
-
-    
+    persons = parse_people(response["data"])
+    if persons:
         print(f"Successfully grabbed {len(response['data'])} records from PDL.")
         print(f"{response.get('total', 0)} total PDL records exist matching this query.")
-    else:
-        print("Error:", response)
 
+    person_store.save_query(sql_query, size, persons, response.get("total"))
+    return persons
+
+
+async def find_people_async(job_titles: List[str], location, offline: bool = PDL_OFFLINE) -> List[Person]:
+    """find_people, but paging through PDL concurrently (see iter_people) without blocking the loop."""
+    sql_query = build_sql_query(job_titles, location)
+    people = await _in_flight.run((sql_query, PDL_SEARCH_SIZE, offline),
+                                  lambda: _find_people_async(sql_query, job_titles, location, offline))
+    #every caller enriches its own copies
+    return [replace(person) for person in people]
+
+
+async def _find_people_async(sql_query: str, job_titles: List[str], location, offline: bool) -> List[Person]:
+    cached = await asyncio.to_thread(_cached_people, sql_query, PDL_SEARCH_SIZE, job_titles, location, offline)
+    if cached is not None:
+        return cached
+
+    errors = []
+    persons = [person async for person in iter_people(job_titles, location, max_results=PDL_SEARCH_SIZE,
+                                                      errors=errors)]
+    #a partial or failed search must not be served from the cache later
+    if not errors:
+        await asyncio.to_thread(person_store.save_query, sql_query, PDL_SEARCH_SIZE, persons)
+    return persons
+
+
+async def _search_page(sql_query: str, size: int, scroll_token: str | None) -> tuple[List[Person], str | None]:
+    """Fetch and parse one page of results, returning the people and the token for the next page."""
+    response = await _search_async(sql_query, size, scroll_token)
+    if response.get("status") == 404:
+        #PDL's answer for "no records match"
+        return [], None
+    if response.get("status") != 200:
+        raise PDLSearchError(f"error with PDL request: {json.dumps(response)}")
+
+    persons = await asyncio.to_thread(_save_page, response.get("data") or [])
+    return persons, response.get("scroll_token")
+
+
+def _save_page(records: List[Dict]) -> List[Person]:
+    persons = parse_people(records)
+    person_store.save_people(persons)
     return persons
 
 
+async def iter_people(job_titles: List[str], location, max_results: int = None, page_size: int = None,
+                      concurrency: int = None, errors: List[Exception] | None = None) -> AsyncIterator[Person]:
+    """Yield people from PDL as each page is parsed, de-duplicated by person_key.
+
+    The title list is split into `concurrency` shards; each shard scrolls through
+    its own query with PDL scroll tokens and the shards run at the same time. Page
+    sizes are reserved from one shared budget so at most ~max_results records
+    (PDL credits) are requested overall. A shard that fails stops there and its
+    exception is appended to `errors`.
+    """
+    max_results = max_results or PDL_SEARCH_SIZE
+    page_size = min(page_size or PDL_PAGE_SIZE, 100)
+    titles = list(dict.fromkeys(job_titles))
+    if not titles:
+        return
+    shards = [titles[i::concurrency or PDL_CONCURRENCY] for i in range(min(concurrency or PDL_CONCURRENCY, len(titles)))]
+
+    queue: asyncio.Queue = asyncio.Queue()
+    finished = object()
+    budget = {"left": max_results}
+
+    async def scroll(shard: List[str]) -> None:
+        sql_query = build_sql_query(shard, location)
+        scroll_token = None
+        try:
+            while budget["left"] > 0:
+                size = min(page_size, budget["left"])
+                budget["left"] -= size
+                persons, scroll_token = await _search_page(sql_query, size, scroll_token)
+                #give back what this page didn't use
+                budget["left"] += size - len(persons)
+                for person in persons:
+                    await queue.put(person)
+                if not scroll_token or len(persons) < size:
+                    break
+        except Exception as e:
+            print("API call failed:", e)
+            if errors is not None:
+                errors.append(e)
+        finally:
+            await queue.put(finished)
+
+    tasks = [asyncio.create_task(scroll(shard)) for shard in shards]
+    seen = set()
+    running = len(tasks)
+    try:
+        while running and len(seen) < max_results:
+            person = await queue.get()
+            if person is finished:
+                running -= 1
+                continue
+            key = person_key(person)
+            if key in seen:
+                continue
+            seen.add(key)
+            yield person
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
 def rate_relevancy(job_title,personal_information, summary)-> int:
     return 0 #return a number 0 through a 100
 
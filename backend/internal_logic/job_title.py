@@ -1,67 +1,67 @@
-from logging import warning
 from typing import List
-from openai import OpenAI
+import asyncio
 import os
+
 from dotenv import load_dotenv
-import ast
 
-#load variables from .env
+from backend.internal_logic import metrics
+from backend.internal_logic.llm_client import acomplete_structured, complete_structured
+from backend.internal_logic.models import JobTitles
+from backend.internal_logic.near_duplicates import MinHashIndex
 
+#load variables from .env
 load_dotenv()
 
-try:
-    openai_api_key = os.getenv("OPENAI_API_KEY")
-    client = OpenAI(api_key=openai_api_key)
-except Exception as e:
-    print(e)
-    openai_api_key = None
-    client = None
-    warning("NO ENV OPENAI_API_KEY found!!")
+#reuse the titles generated for a reworded version of the same overview
+TITLE_REUSE_ENABLED = os.getenv("TITLE_REUSE_ENABLED", "1") == "1"
 
+title_index = MinHashIndex("job_titles")
+metrics.Counter("job_titles_near_duplicate_total", "Job title lookups in the near-duplicate overview index.",
+                ("outcome",), source=lambda: {(outcome,): count for outcome, count in title_index.counters.items()})
+metrics.Gauge("job_titles_near_duplicate_threshold", "Overview similarity needed to reuse stored job titles.",
+              source=lambda: {(): title_index.threshold})
 
-def get_job_title_list(event_summary: str)-> List[str]:
 
+def get_job_title_list(event_summary: str)-> List[str]:
+    if TITLE_REUSE_ENABLED:
+        titles = title_index.get(event_summary)
+        if titles is not None:
+            return titles
+    result = complete_structured("job_titles", _messages(event_summary), JobTitles, model="gpt-4o", temperature=0.6)
+    titles = result.job_titles if result else []
+    if TITLE_REUSE_ENABLED and titles:
+        title_index.add(event_summary, titles)
+    return titles
+
+
+async def get_job_title_list_async(event_summary: str) -> List[str]:
+    if TITLE_REUSE_ENABLED:
+        titles = await asyncio.to_thread(title_index.get, event_summary)
+        if titles is not None:
+            return titles
+    result = await acomplete_structured("job_titles", _messages(event_summary), JobTitles, model="gpt-4o",
+                                        temperature=0.6)
+    titles = result.job_titles if result else []
+    if TITLE_REUSE_ENABLED and titles:
+        await asyncio.to_thread(title_index.add, event_summary, titles)
+    return titles
+
+
+def _messages(event_summary: str) -> list[dict]:
     prompt = f"""
         Given the following project summary, list the types of job titles (mostly government or community organization positions) that should be contacted to support or enable the project.
 
         Project Summary:
         {event_summary}
 
-        Return the job titles as a Python list.
+        Return the job titles as a JSON object with a "job_titles" list.
         """
 
-    response = client.chat.completions.create(model="gpt-4o",
-    messages=[
+    return [
         {"role": "system", "content": "You help generate relevant job titles for sustainability-related community projects."},
         {"role": "user", "content": prompt}
-    ],
-    temperature=0.6)
-
-    #plain text response from gippity
-    content = response.choices[0].message.content
-
-    try:
-        #handle gippity's weird outputs
-        content_clean = content.strip()
-
-        if content_clean.startswith("```"):
-            lines = content_clean.splitlines()
-            lines = [line for line in lines if not line.startswith("```")]
-            content_clean = "\n".join(lines)
-
-        if "=" in content_clean:
-            content_clean = content_clean.split("=", 1)[1].strip()
-
-        job_titles = ast.literal_eval(content_clean) if content_clean.startswith("[") else [
-            title.strip() for title in content_clean.split("\n") if title.strip()
-        ]
-
-        return job_titles
+    ]
 
-    except Exception as e:
-        print("could not parse job title list:", e)
-        print("raw output:\n", content)
-        return []
 
 if __name__ == "__main__":
     event_summary = "We are organizing a community-led initiative to transform an abandoned lot into a green space that includes a community garden, native plant landscaping, and educational signage about local ecology. The goal is to improve food access, promote environmental awareness, and create a safe, beautiful space for residents to gather. We are seeking support with land use approvals, funding, volunteer coordination, and long-term maintenance partnerships."
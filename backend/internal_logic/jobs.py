@@ -0,0 +1,210 @@
+import asyncio
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import aclosing
+from dataclasses import asdict
+
+from dotenv import load_dotenv
+
+from backend.internal_logic import rate_limit
+from backend.internal_logic.models import ProjectSubmission
+from backend.internal_logic.pipeline import proposal_events
+from backend.internal_logic.storage import connect, process_alive
+
+#load variables from .env
+load_dotenv()
+
+#proposals being worked on at the same time
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+#queued proposals accepted before new ones are turned away
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+#workers also look for queued jobs this often, in case a wake-up was missed
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "2"))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class QueueFull(Exception):
+    pass
+
+
+_conn = None
+_lock = threading.Lock()
+
+
+def _db():
+    global _conn
+    if _conn is None:
+        _conn = connect("jobs.sqlite3")
+        _conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                request TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at);
+        """)
+        #pid of the server process running the job, for databases made before multi-worker mode
+        if "worker_pid" not in {column[1] for column in _conn.execute("PRAGMA table_info(jobs)")}:
+            _conn.execute("ALTER TABLE jobs ADD COLUMN worker_pid INTEGER")
+    return _conn
+
+
+def create_job(event: ProjectSubmission) -> str:
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    with _lock:
+        db = _db()
+        #count and insert in one write transaction, so workers sharing the file can't overfill the queue
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            (queued,) = db.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()
+            if queued >= JOB_QUEUE_SIZE:
+                raise QueueFull(f"{queued} proposals already waiting")
+            db.execute(
+                "INSERT INTO jobs (id, status, request, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, QUEUED, event.model_dump_json(), now, now),
+            )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+    return job_id
+
+
+def get_job(job_id: str) -> dict | None:
+    with _lock:
+        row = _db().execute(
+            "SELECT id, status, result, error, created_at, updated_at FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+    if row is None:
+        return None
+    return {
+        "job_id": row[0],
+        "status": row[1],
+        "result": json.loads(row[2]) if row[2] else None,
+        "error": row[3],
+        "created_at": row[4],
+        "updated_at": row[5],
+    }
+
+
+def _claim_next() -> tuple[str, str] | None:
+    """Atomically move the oldest queued job to running."""
+    with _lock:
+        return _db().execute(
+            "UPDATE jobs SET status = ?, worker_pid = ?, updated_at = ? WHERE id = ("
+            " SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1"
+            ") RETURNING id, request",
+            (RUNNING, os.getpid(), time.time(), QUEUED),
+        ).fetchone()
+
+
+def _update(job_id: str, status: str, result: dict | None = None, error: str | None = None) -> None:
+    with _lock:
+        _db().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+            (status, json.dumps(result) if result is not None else None, error, time.time(), job_id),
+        )
+
+
+def _snapshot(result: dict) -> dict:
+    #the worker keeps appending to the lists while a thread serialises the copy
+    return {key: list(value) if isinstance(value, list) else value for key, value in result.items()}
+
+
+def _requeue_interrupted() -> None:
+    #jobs whose server process stopped start over; other workers' running jobs are left alone
+    with _lock:
+        db = _db()
+        orphans = [job_id for job_id, pid in db.execute(
+            "SELECT id, worker_pid FROM jobs WHERE status = ?", (RUNNING,)) if not process_alive(pid)]
+        db.executemany("UPDATE jobs SET status = ?, result = NULL WHERE id = ? AND status = ?",
+                       [(QUEUED, job_id, RUNNING) for job_id in orphans])
+
+
+class JobPool:
+    """Fixed number of asyncio workers running queued proposals from the jobs table.
+
+    The table is shared with other server processes, so every query runs in a thread
+    rather than holding up the event loop while SQLite waits on their locks.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS):
+        self.workers = workers
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup: asyncio.Event | None = None
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        await asyncio.to_thread(_requeue_interrupted)
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, event: ProjectSubmission) -> str:
+        """Queue a proposal and return its job id; raises QueueFull when too many are waiting."""
+        await self.start()
+        job_id = await asyncio.to_thread(create_job, event)
+        self._wakeup.set()
+        return job_id
+
+    async def _worker(self) -> None:
+        while True:
+            self._wakeup.clear()
+            claimed = await asyncio.to_thread(_claim_next)
+            if claimed is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), JOB_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(*claimed)
+
+    async def _run(self, job_id: str, request: str) -> None:
+        #queued jobs give way to people waiting on /project/proposal
+        rate_limit.priority.set(rate_limit.BACKGROUND)
+        event = ProjectSubmission.model_validate_json(request)
+        result: dict = {}
+        saving = None
+        try:
+            #closed on cancellation too, so the pipeline's speculative tasks stop with the job
+            async with aclosing(proposal_events(event, incremental=True)) as events:
+                async for update in events:
+                    if update["type"] == "feedback":
+                        result["feedback"] = update["feedback"]
+                    elif update["type"] == "job_titles":
+                        result["job_titles"] = update["job_titles"]
+                        result["people_list"] = []
+                    elif update["type"] == "person":
+                        result["people_list"].append(asdict(update["person"]))
+                    #save partial results so pollers see progress; the write finishes even if we are cancelled
+                    saving = asyncio.ensure_future(asyncio.to_thread(_update, job_id, RUNNING, _snapshot(result)))
+                    await asyncio.shield(saving)
+        except asyncio.CancelledError:
+            #shutting down, picked up again on the next start; a progress write still in flight lands first
+            if saving is not None:
+                await asyncio.wait([saving])
+            await asyncio.to_thread(_update, job_id, QUEUED)
+            raise
+        except Exception as e:
+            print("proposal job failed:", e)
+            await asyncio.to_thread(_update, job_id, FAILED, _snapshot(result), str(e))
+            return
+        await asyncio.to_thread(_update, job_id, DONE, _snapshot(result))
+
+
+pool = JobPool()
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from dotenv import load_dotenv
+
+from backend.internal_logic.storage import connect
+
+#load variables from .env
+load_dotenv()
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "20000"))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "512"))
+#expired and over-limit rows are purged once per this many writes, not on every one
+LLM_CACHE_EVICT_EVERY = int(os.getenv("LLM_CACHE_EVICT_EVERY", "100"))
+
+
+def cache_key(stage: str, model: str, messages: list[dict], temperature: float, **params) -> str:
+    """Content address of one completion request."""
+    payload = json.dumps([stage, model, messages, temperature, params], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Two tier (in-memory LRU in front of SQLite) cache of LLM outputs with TTL and LRU eviction."""
+
+    def __init__(self, db_name: str = "llm_cache.sqlite3", ttl_seconds: float = LLM_CACHE_TTL_SECONDS,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES, memory_entries: int = LLM_CACHE_MEMORY_ENTRIES,
+                 evict_every: int = LLM_CACHE_EVICT_EVERY):
+        self.db_name = db_name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.evict_every = max(evict_every, 1)
+        self._writes = 0
+        self.counters = Counter()
+        self._memory: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        #opened lazily so importing never touches disk
+        if self._conn is None:
+            self._conn = connect(self.db_name)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    stage TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache (accessed_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_created ON llm_cache (created_at)")
+        return self._conn
+
+    def _remember(self, key: str, value: str, created_at: float) -> None:
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, stage: str, key: str) -> str | None:
+        value = self.get_memory(stage, key)
+        return value if value is not None else self.get_disk(stage, key)
+
+    def get_memory(self, stage: str, key: str) -> str | None:
+        """Memory tier only; never touches SQLite, so it is safe to call on the event loop."""
+        now = time.time()
+        with self._lock:
+            hit = self._memory.get(key)
+            if hit is not None and now - hit[1] <= self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self.counters[(stage, "memory_hit")] += 1
+                return hit[0]
+            self._memory.pop(key, None)
+            return None
+
+    def get_disk(self, stage: str, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self.counters[(stage, "expired")] += 1
+                self.counters[(stage, "miss")] += 1
+                return None
+
+            db.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._remember(key, row[0], row[1])
+            self.counters[(stage, "disk_hit")] += 1
+            return row[0]
+
+    def set(self, stage: str, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, stage, value, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, stage, value, now, now),
+            )
+            self._remember(key, value, now)
+            self._writes += 1
+            if self._writes % self.evict_every == 0:
+                self._evict(db, now)
+
+    def _evict(self, db, now: float) -> None:
+        expired = db.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,)).rowcount
+        (count,) = db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            db.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY accessed_at LIMIT ?)",
+                (overflow,),
+            )
+        self.counters[("*", "evicted")] += max(expired, 0) + max(overflow, 0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._db().execute("DELETE FROM llm_cache")
+
+    def stats(self) -> dict:
+        """Hit/miss counters per stage, e.g. {"bio": {"memory_hit": 3, "miss": 1}}."""
+        result: dict[str, dict[str, int]] = {}
+        for (stage, outcome), count in self.counters.items():
+            result.setdefault(stage, {})[outcome] = count
+        return result
+
+
+cache = LLMCache()
@@ -0,0 +1,293 @@
+import asyncio
+import os
+import threading
+import weakref
+from logging import warning
+from typing import TYPE_CHECKING, AsyncIterator, Type, TypeVar
+
+import httpx
+from dotenv import load_dotenv
+from pydantic import BaseModel, ValidationError
+
+from backend.internal_logic import metrics, rate_limit
+from backend.internal_logic.llm_cache import LLM_CACHE_ENABLED, cache, cache_key
+from backend.internal_logic.single_flight import SingleFlight
+from backend.internal_logic.tokens import estimate_message_tokens
+
+if TYPE_CHECKING:
+    #the openai package is slow to import, so it is only loaded when a client is first needed
+    from openai import AsyncOpenAI, OpenAI
+
+#load variables from .env
+load_dotenv()
+
+#connection pool settings shared by every stage
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "20"))
+LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "120"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "10"))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "1") == "1"
+#completion size assumed for the tokens-per-minute limit when a stage sets no max_tokens
+LLM_EXPECTED_COMPLETION_TOKENS = int(os.getenv("LLM_EXPECTED_COMPLETION_TOKENS", "500"))
+
+#USD per million (prompt, completion) tokens, for the estimated cost counter
+MODEL_PRICES = {"gpt-4o": (2.50, 10.00), "gpt-4o-mini": (0.15, 0.60)}
+
+LLM_REQUESTS = metrics.Counter("llm_requests_total", "Completions per stage, answered by the cache or the API.",
+                               ("stage", "source"))
+LLM_TOKENS = metrics.Counter("llm_tokens_total", "Tokens used by API completions.", ("stage", "model", "kind"))
+LLM_COST = metrics.Counter("llm_cost_usd_total", "Estimated spend on API completions.", ("stage", "model"))
+LLM_CACHE_EVENTS = metrics.Counter("llm_cache_events_total", "LLM cache lookups by stage and outcome.",
+                                   ("stage", "outcome"), source=lambda: dict(cache.counters))
+LLM_INVALID_OUTPUTS = metrics.Counter("llm_invalid_outputs_total",
+                                      "Structured completions that did not match their schema.", ("stage",))
+
+T = TypeVar("T", bound=BaseModel)
+
+_client: "OpenAI | None" = None
+_client_lock = threading.Lock()
+#httpx async pools are bound to the loop they were opened on
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = weakref.WeakKeyDictionary()
+#identical completions requested at the same time share one API call
+_in_flight = SingleFlight("llm")
+
+
+def _http_options() -> dict:
+    return {
+        "http2": LLM_HTTP2,
+        "limits": httpx.Limits(
+            max_connections=LLM_POOL_SIZE,
+            max_keepalive_connections=LLM_POOL_SIZE,
+            keepalive_expiry=LLM_KEEPALIVE_SECONDS,
+        ),
+        "timeout": httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=LLM_CONNECT_TIMEOUT_SECONDS),
+    }
+
+
+def _api_key() -> str | None:
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        warning("NO ENV OPENAI_API_KEY found!!")
+    return api_key
+
+
+def get_client() -> "OpenAI":
+    """Return the process-wide sync OpenAI client, creating it on first use."""
+    from openai import OpenAI
+
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OpenAI(
+                api_key=_api_key(),
+                timeout=LLM_TIMEOUT_SECONDS,
+                #retries go through rate_limit so every caller backs off together
+                max_retries=0,
+                http_client=httpx.Client(**_http_options()),
+            )
+        return _client
+
+
+def get_async_client() -> "AsyncOpenAI":
+    """Return the AsyncOpenAI client for the running event loop, creating it on first use."""
+    from openai import AsyncOpenAI
+
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = AsyncOpenAI(
+            api_key=_api_key(),
+            timeout=LLM_TIMEOUT_SECONDS,
+            max_retries=0,
+            http_client=httpx.AsyncClient(**_http_options()),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def close_client() -> None:
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+async def aclose_client() -> None:
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
+
+
+def _expected_tokens(messages: list[dict], params: dict) -> int:
+    return estimate_message_tokens(messages) + params.get("max_tokens", LLM_EXPECTED_COMPLETION_TOKENS)
+
+
+def _record_usage(stage: str, model: str, usage) -> None:
+    """Count the tokens (and estimated cost) reported in a completion's `usage`."""
+    LLM_REQUESTS.inc(stage=stage, source="api")
+    if usage is None:
+        return
+    LLM_TOKENS.inc(usage.prompt_tokens, stage=stage, model=model, kind="prompt")
+    LLM_TOKENS.inc(usage.completion_tokens, stage=stage, model=model, kind="completion")
+    prompt_price, completion_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    LLM_COST.inc((usage.prompt_tokens * prompt_price + usage.completion_tokens * completion_price) / 1e6,
+                 stage=stage, model=model)
+
+
+def complete(stage: str, messages: list[dict], model: str = "gpt-4o", temperature: float = 1.0,
+             refresh: bool = False, **params) -> str:
+    """Run a chat completion through the shared client and return the message text.
+
+    Results are cached per (stage, model, messages, temperature, params); `refresh`
+    skips the lookup but still stores the fresh answer.
+    """
+    key = cache_key(stage, model, messages, temperature, **params)
+    if LLM_CACHE_ENABLED and not refresh:
+        cached = cache.get(stage, key)
+        if cached is not None:
+            LLM_REQUESTS.inc(stage=stage, source="cache")
+            return cached
+
+    with metrics.span(f"llm.{stage}"):
+        completion = rate_limit.limiter("openai", model).run_sync(
+            lambda: get_client().chat.completions.create(
+                model=model, messages=messages, temperature=temperature, **params
+            ),
+            tokens=_expected_tokens(messages, params),
+        )
+    _record_usage(stage, model, completion.usage)
+    content = completion.choices[0].message.content
+
+    if LLM_CACHE_ENABLED and content is not None:
+        cache.set(stage, key, content)
+    return content
+
+
+async def _cache_get(stage: str, key: str) -> str | None:
+    #SQLite (and its busy timeout) stays off the event loop
+    cached = cache.get_memory(stage, key)
+    return cached if cached is not None else await asyncio.to_thread(cache.get_disk, stage, key)
+
+
+async def acomplete(stage: str, messages: list[dict], model: str = "gpt-4o", temperature: float = 1.0,
+                    refresh: bool = False, **params) -> str:
+    """Async version of `complete`; concurrent identical requests also share one API call."""
+    key = cache_key(stage, model, messages, temperature, **params)
+    if refresh:
+        return await _acomplete(stage, key, messages, model, temperature, params)
+    if LLM_CACHE_ENABLED:
+        cached = await _cache_get(stage, key)
+        if cached is not None:
+            LLM_REQUESTS.inc(stage=stage, source="cache")
+            return cached
+    return await _in_flight.run(key, lambda: _acomplete(stage, key, messages, model, temperature, params))
+
+
+async def _acomplete(stage: str, key: str, messages: list[dict], model: str, temperature: float, params: dict) -> str:
+    with metrics.span(f"llm.{stage}"):
+        completion = await rate_limit.limiter("openai", model).run(
+            lambda: get_async_client().chat.completions.create(
+                model=model, messages=messages, temperature=temperature, **params
+            ),
+            tokens=_expected_tokens(messages, params),
+        )
+    _record_usage(stage, model, completion.usage)
+    content = completion.choices[0].message.content
+
+    if LLM_CACHE_ENABLED and content is not None:
+        await asyncio.to_thread(cache.set, stage, key, content)
+    return content
+
+
+async def astream_complete(stage: str, messages: list[dict], model: str = "gpt-4o", temperature: float = 1.0,
+                           **params) -> AsyncIterator[str]:
+    """Like `acomplete` but yields the text as it is generated (a cached answer comes back in one piece)."""
+    key = cache_key(stage, model, messages, temperature, **params)
+    if LLM_CACHE_ENABLED:
+        cached = await _cache_get(stage, key)
+        if cached is not None:
+            LLM_REQUESTS.inc(stage=stage, source="cache")
+            yield cached
+            return
+
+    parts = []
+    usage = None
+    with metrics.span(f"llm.{stage}"):
+        #only opening the stream is retried, a stream that breaks halfway fails
+        stream = await rate_limit.limiter("openai", model).run(
+            lambda: get_async_client().chat.completions.create(
+                model=model, messages=messages, temperature=temperature, stream=True,
+                stream_options={"include_usage": True}, **params
+            ),
+            tokens=_expected_tokens(messages, params),
+        )
+        async for chunk in stream:
+            #the last chunk carries the usage and no choices
+            usage = chunk.usage or usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+                yield parts[-1]
+    _record_usage(stage, model, usage)
+
+    if LLM_CACHE_ENABLED and parts:
+        await asyncio.to_thread(cache.set, stage, key, "".join(parts))
+
+
+def response_format(schema: Type[BaseModel]) -> dict:
+    """OpenAI strict JSON-schema response format for a pydantic model.
+
+    Strict mode wants every property listed as required (optional ones are nullable)
+    and no extra properties, so the generated schema is adjusted to match.
+    """
+    def strict(node):
+        if isinstance(node, list):
+            for value in node:
+                strict(value)
+        elif isinstance(node, dict):
+            node.pop("default", None)
+            node.pop("title", None)
+            if "properties" in node:
+                node["required"] = list(node["properties"])
+                node["additionalProperties"] = False
+            for key, value in node.items():
+                #property and definition names are not schema keywords
+                for child in (value.values() if key in ("properties", "$defs") else [value]):
+                    strict(child)
+        return node
+
+    return {"type": "json_schema",
+            "json_schema": {"name": schema.__name__, "schema": strict(schema.model_json_schema()), "strict": True}}
+
+
+def parse_output(stage: str, content: str | None, schema: Type[T]) -> T | None:
+    """The completion validated against `schema`, or None (counted) if it does not fit."""
+    try:
+        return schema.model_validate_json(content or "")
+    except ValidationError as e:
+        LLM_INVALID_OUTPUTS.inc(stage=stage)
+        print(f"invalid {stage} output:", e.error_count(), "error(s) in", repr(content)[:200])
+        return None
+
+
+def complete_structured(stage: str, messages: list[dict], schema: Type[T], model: str = "gpt-4o",
+                        temperature: float = 1.0, **params) -> T | None:
+    """`complete` constrained to `schema`; one fresh retry if the answer still fails validation."""
+    params["response_format"] = response_format(schema)
+    for refresh in (False, True):
+        result = parse_output(stage, complete(stage, messages, model=model, temperature=temperature,
+                                              refresh=refresh, **params), schema)
+        if result is not None:
+            return result
+    return None
+
+
+async def acomplete_structured(stage: str, messages: list[dict], schema: Type[T], model: str = "gpt-4o",
+                               temperature: float = 1.0, **params) -> T | None:
+    params["response_format"] = response_format(schema)
+    for refresh in (False, True):
+        result = parse_output(stage, await acomplete(stage, messages, model=model, temperature=temperature,
+                                                     refresh=refresh, **params), schema)
+        if result is not None:
+            return result
+    return None
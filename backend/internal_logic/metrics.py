@@ -0,0 +1,325 @@
+import asyncio
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from dotenv import load_dotenv
+
+from backend.internal_logic import storage
+
+#load variables from .env
+load_dotenv()
+
+#with several server worker processes, each one writes its metrics to DATA_DIR/metrics
+#and /metrics adds them all up, whichever worker answers the scrape
+METRICS_SHARED = os.getenv("METRICS_SHARED", "0") == "1"
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+
+#every metric name starts with this
+METRICS_PREFIX = "plantparty"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+#upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_registry: List["_Metric"] = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = f"{METRICS_PREFIX}_{name}"
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def render(self, values: Dict | None = None) -> List[str]:
+        values = self.snapshot() if values is None else values
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self._samples(values)]
+
+    def snapshot(self) -> Dict:
+        raise NotImplementedError
+
+    def merge(self, snapshots: List[List]) -> Dict:
+        """Combine [key, value] lists written by several processes."""
+        raise NotImplementedError
+
+    def _samples(self, values: Dict) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic count per label set; `source` reads the counts from an existing dict instead."""
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (),
+                 source: Callable[[], Dict[Tuple, float]] | None = None):
+        super().__init__(name, help, labelnames)
+        self.source = source
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return dict(self.source()) if self.source else dict(self._values)
+
+    def merge(self, snapshots: List[List]) -> Dict:
+        values: Dict[Tuple, float] = {}
+        for snapshot in snapshots:
+            for key, value in snapshot:
+                values[tuple(key)] = values.get(tuple(key), 0) + value
+        return values
+
+    def _samples(self, values: Dict) -> List[str]:
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in sorted(values.items())]
+
+
+class Gauge(Counter):
+    """Current value per label set."""
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def merge(self, snapshots: List[List]) -> Dict:
+        #a sum means nothing for a current value; report the highest
+        values: Dict[Tuple, float] = {}
+        for snapshot in snapshots:
+            for key, value in snapshot:
+                values[tuple(key)] = max(values.get(tuple(key), value), value)
+        return values
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        #label set -> (count per bucket incl. +Inf, sum)
+        self._values: Dict[Tuple, Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def count(self, **labels) -> int:
+        counts, _ = self._values.get(self._key(labels)) or ([0], 0.0)
+        return sum(counts)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+
+    def merge(self, snapshots: List[List]) -> Dict:
+        values: Dict[Tuple, Tuple[List[int], float]] = {}
+        for snapshot in snapshots:
+            for key, (counts, total) in snapshot:
+                merged, merged_total = values.get(tuple(key)) or ([0] * len(counts), 0.0)
+                values[tuple(key)] = ([a + b for a, b in zip(merged, counts)], merged_total + total)
+        return values
+
+    def _samples(self, values: Dict) -> List[str]:
+        lines = []
+        for key, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                labels = _labels(self.labelnames, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text exposition format (summed over workers when shared)."""
+    if METRICS_SHARED:
+        snapshots = shared.collect()
+        return "\n".join(line for metric in _registry
+                         for line in metric.render(metric.merge([s.get(metric.name, []) for s in snapshots]))) + "\n"
+    return "\n".join(line for metric in _registry for line in metric.render()) + "\n"
+
+
+def _file_pid(path: str) -> int | None:
+    #snapshot files are named <pid>-<random>.json
+    try:
+        return int(os.path.basename(path).split("-")[0])
+    except ValueError:
+        return None
+
+
+class SharedMetrics:
+    """Per-process metric snapshots in one directory, written atomically and read back by render().
+
+    When a worker exits, its counters and histograms are folded into retired.json
+    and its file is deleted, so totals never drop and the directory stays as small
+    as the number of live workers. Its gauges go with it. clear() at server start
+    resets everything, as restarting one process would.
+    """
+
+    def __init__(self, flush_seconds: float = METRICS_FLUSH_SECONDS):
+        self.flush_seconds = flush_seconds
+        self._file: tuple[int, str] | None = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def directory(self) -> str:
+        return os.path.join(storage.DATA_DIR, "metrics")
+
+    def _path(self) -> str:
+        #named per process, never per pid alone: a reused pid must not overwrite a dead worker's counts
+        if self._file is None or self._file[0] != os.getpid():
+            self._file = (os.getpid(), f"{os.getpid()}-{uuid.uuid4().hex[:8]}.json")
+        return os.path.join(self.directory, self._file[1])
+
+    def _dump(self, path: str, snapshot: Dict) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        with open(f"{path}.tmp", "w") as out:
+            json.dump(snapshot, out)
+        os.replace(f"{path}.tmp", path)
+
+    def write(self) -> None:
+        snapshot = {metric.name: [[list(key), value] for key, value in metric.snapshot().items()]
+                    for metric in _registry}
+        #the flush thread and scrapes both write this process's file
+        with self._lock:
+            self._dump(self._path(), snapshot)
+
+    def collect(self) -> List[Dict]:
+        #this process's numbers are written first, so what a scrape returns is never newer than the files
+        self.write()
+        self._retire()
+        snapshots = []
+        for path in glob.glob(os.path.join(self.directory, "*.json")):
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    def _retire(self) -> None:
+        """Fold the snapshots of workers that have exited into retired.json and delete them."""
+        own = self._path()
+        retired_path = os.path.join(self.directory, "retired.json")
+        dead = [path for path in glob.glob(os.path.join(self.directory, "*.json"))
+                if path not in (own, retired_path) and not storage.process_alive(_file_pid(path))]
+        if not dead:
+            return
+        #workers scraped at the same time must not fold the same file twice
+        with self._lock, storage.file_lock(os.path.join(self.directory, "retired.lock")):
+            snapshots, folded = [], []
+            for path in [retired_path, *dead]:
+                try:
+                    with open(path) as f:
+                        snapshots.append(json.load(f))
+                except FileNotFoundError:
+                    #already folded by another worker
+                    continue
+                except (OSError, ValueError) as e:
+                    print("unreadable metrics snapshot:", path, e)
+                    continue
+                if path != retired_path:
+                    folded.append(path)
+            if not folded:
+                return
+            self._dump(retired_path, {
+                metric.name: [[list(key), value] for key, value in
+                              metric.merge([s.get(metric.name, []) for s in snapshots]).items()]
+                for metric in _registry if metric.kind != "gauge"
+            })
+            for path in folded:
+                os.remove(path)
+
+    def clear(self) -> None:
+        for path in glob.glob(os.path.join(self.directory, "*.json*")):
+            os.remove(path)
+
+    def start(self) -> None:
+        """Write a snapshot every flush_seconds from a background thread (started per worker, after fork)."""
+        if self._thread is None:
+            self.write()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="metrics-flush", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.write()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_seconds):
+            try:
+                self.write()
+            except OSError as e:
+                print("metrics snapshot failed:", e)
+
+
+shared = SharedMetrics()
+
+
+STAGE_SECONDS = Histogram("stage_seconds", "Time spent in each pipeline stage.", ("stage", "outcome"))
+
+
+@contextmanager
+def span(stage: str, trace: List[dict] | None = None) -> Iterator[None]:
+    """Time the enclosed block into stage_seconds, appending it to `trace` (one proposal's spans) if given."""
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except (asyncio.CancelledError, GeneratorExit):
+        outcome = "cancelled"
+        raise
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage, outcome=outcome)
+        if trace is not None:
+            trace.append({"stage": stage, "ms": round(elapsed * 1000, 1), "outcome": outcome})
@@ -1,6 +1,6 @@
 from dataclasses import field, dataclass, asdict
-from typing import Optional, Dict, List, Tuple
-from pydantic import BaseModel, Field
+from typing import Literal, Optional, Dict, List, Tuple
+from pydantic import BaseModel, Field, field_validator
 
 # Pydantic Model for Coordinates
 class Coordinates(BaseModel):
@@ -19,9 +19,66 @@ class Location(BaseModel):
 class ProjectSubmission(BaseModel):
     project_overview: str = Field(..., example="A super awesome community garden 20sq ft")
     location: Location
+    # "separate" (bio, score, email calls) or "combined" (one call per person), server default if unset
+    enrichment: Optional[Literal["separate", "combined"]] = Field(None, example="combined")
 
-# Dataclass for Person
-@dataclass
+# Pydantic Model for an on-demand email draft request
+class EmailDraftRequest(BaseModel):
+    project_overview: str = Field(..., example="A super awesome community garden 20sq ft")
+    linkedin_url: Optional[str] = Field(None, example="https://linkedin.com/in/matthewmcorbin")
+    bio: Optional[str] = Field(None, example="- Runs community outreach for the county")
+    # the profile as the proposal returned it, used when the person isn't stored (e.g. no LinkedIn profile)
+    name: Optional[str] = Field(None, example="Matthew Corbin")
+    current_job_title: Optional[str] = Field(None, example="urban planner")
+    company_name: Optional[str] = Field(None, example="city of charlotte")
+    location: Optional[str] = Field(None, example="charlotte, north carolina, united states")
+    stream: bool = False
+
+# Pydantic Models for LLM answers, sent to OpenAI as JSON schemas and validated on the way back
+class JobTitles(BaseModel):
+    job_titles: List[str]
+
+    @field_validator("job_titles")
+    @classmethod
+    def drop_blank(cls, titles: List[str]) -> List[str]:
+        return [title.strip() for title in titles if title.strip()]
+
+class DescriptionCheck(BaseModel):
+    enough_detail: bool
+    # friendly advice on improving the summary, empty when it has enough detail
+    feedback: str
+
+def _clamp_score(score: Optional[int]) -> Optional[int]:
+    return None if score is None else max(1, min(100, score))
+
+class RelevanceScore(BaseModel):
+    score: int
+
+    _clamp = field_validator("score")(_clamp_score)
+
+class CandidateScore(BaseModel):
+    id: int
+    score: int
+
+    _clamp = field_validator("score")(_clamp_score)
+
+class RelevanceScores(BaseModel):
+    scores: List[CandidateScore]
+
+class CombinedEnrichment(BaseModel):
+    bio: Optional[str]
+    score: Optional[int]
+    email_draft: Optional[str]
+
+    _clamp = field_validator("score")(_clamp_score)
+
+    @field_validator("bio", "email_draft")
+    @classmethod
+    def blank_to_none(cls, text: Optional[str]) -> Optional[str]:
+        return text.strip() or None if text is not None else None
+
+# Dataclass for Person, slotted since searches hold many of them
+@dataclass(slots=True)
 class Person:
     # Fields required in final object
     name: Optional[str] = None
@@ -41,5 +98,10 @@ class Person:
     summary: Optional[str] = None
     phone_numbers: List[str] = field(default_factory=list)
     past_job_title: List[Tuple[str, int]] = field(default_factory=list)
+    coordinates: Optional[Tuple[float, float]] = None  # (latitude, longitude)
+
+# Who a Person is, for de-duplicating; people without a LinkedIn profile go by name and company
+def person_key(person: Person):
+    return person.linkedin_url or (person.name, person.company_name)
 
 # ✅ Now all fields should work properly with FastAPI & Pydantic!
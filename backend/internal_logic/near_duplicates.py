@@ -0,0 +1,170 @@
+import json
+import os
+import threading
+import time
+import zlib
+from collections import Counter
+
+import numpy as np
+from dotenv import load_dotenv
+
+from backend.internal_logic.llm_cache import LLM_CACHE_EVICT_EVERY, LLM_CACHE_TTL_SECONDS
+from backend.internal_logic.prerank import tokenize
+from backend.internal_logic.storage import connect
+
+#load variables from .env
+load_dotenv()
+
+#reuse a stored answer when the overviews' estimated Jaccard similarity is at least this
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.7"))
+#signature = BANDS x ROWS min-hashes; two overviews become candidates when one band matches exactly
+LSH_BANDS = int(os.getenv("LSH_BANDS", "20"))
+LSH_ROWS = int(os.getenv("LSH_ROWS", "5"))
+#stored answers expire with the LLM cache entries they came from; the oldest go past this many per index
+NEAR_DUPLICATE_MAX_ENTRIES = int(os.getenv("NEAR_DUPLICATE_MAX_ENTRIES", "20000"))
+
+#universal hashing (a*x + b) mod p of 32-bit shingle hashes; a, b < p keeps a*x + b inside 64 bits
+_PRIME = (1 << 31) - 1
+
+
+def shingles(text: str) -> set[str]:
+    """Stemmed words and word pairs, so rewording and reordering only change part of the set."""
+    words = tokenize(text)
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+class MinHashIndex:
+    """Local near-duplicate lookup of past texts (MinHash signatures + LSH banding in SQLite).
+
+    `get` returns the value stored for the most similar past text if its estimated
+    Jaccard similarity reaches `threshold`, otherwise None. Entries expire after
+    `ttl_seconds`, like the LLM cache, and are pruned every `evict_every` inserts.
+    """
+
+    def __init__(self, name: str, db_name: str = "near_duplicates.sqlite3", threshold: float = NEAR_DUPLICATE_THRESHOLD,
+                 bands: int = LSH_BANDS, rows: int = LSH_ROWS, seed: int = 1, ttl_seconds: float = LLM_CACHE_TTL_SECONDS,
+                 max_entries: int = NEAR_DUPLICATE_MAX_ENTRIES, evict_every: int = LLM_CACHE_EVICT_EVERY):
+        self.name = name
+        self.db_name = db_name
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(max_entries, 1)
+        self.evict_every = max(evict_every, 1)
+        self._writes = 0
+        #"hit" / "miss" / "evicted"
+        self.counters = Counter()
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, bands * rows, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, bands * rows, dtype=np.uint64)
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        #opened lazily so importing never touches disk
+        if self._conn is None:
+            self._conn = connect(self.db_name)
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS minhash_entries (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    signature BLOB NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS minhash_bands (
+                    name TEXT NOT NULL,
+                    band INTEGER NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    entry_id INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_minhash_bands ON minhash_bands (name, band, bucket);
+                CREATE INDEX IF NOT EXISTS idx_minhash_bands_entry ON minhash_bands (entry_id);
+                CREATE INDEX IF NOT EXISTS idx_minhash_entries_text ON minhash_entries (name, text);
+                CREATE INDEX IF NOT EXISTS idx_minhash_entries_created ON minhash_entries (name, created_at);
+            """)
+        return self._conn
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = np.array([zlib.crc32(s.encode("utf-8")) for s in shingles(text)], dtype=np.uint64)
+        if not hashes.size:
+            return np.full(self.bands * self.rows, _PRIME, dtype=np.uint64)
+        #one row per hash function, min over the shingles
+        return ((np.outer(self._a, hashes) + self._b[:, None]) % np.uint64(_PRIME)).min(axis=1)
+
+    def _buckets(self, signature: np.ndarray) -> list[int]:
+        return [zlib.crc32(band.tobytes()) for band in signature.reshape(self.bands, self.rows)]
+
+    def get(self, text: str):
+        """Stored value for the most similar past text at or above the threshold, or None."""
+        signature = self.signature(text)
+        buckets = self._buckets(signature)
+        where = " OR ".join(["(band = ? AND bucket = ?)"] * len(buckets))
+        with self._lock:
+            db = self._db()
+            rows = db.execute(
+                f"SELECT id, signature, value FROM minhash_entries WHERE created_at >= ? AND id IN ("
+                f" SELECT entry_id FROM minhash_bands WHERE name = ? AND ({where}))",
+                (time.time() - self.ttl_seconds, self.name, *(value for pair in enumerate(buckets) for value in pair)),
+            ).fetchall()
+
+        best, best_similarity = None, 0.0
+        for _, stored, value in rows:
+            similarity = float(np.mean(np.frombuffer(stored, dtype=np.uint64) == signature))
+            if similarity > best_similarity:
+                best, best_similarity = value, similarity
+        hit = best is not None and best_similarity >= self.threshold
+        #called from several threads at once
+        with self._lock:
+            self.counters["hit" if hit else "miss"] += 1
+        return json.loads(best) if hit else None
+
+    def add(self, text: str, value) -> None:
+        signature = self.signature(text)
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            #one transaction, so workers missing on the same text at once store it only once
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                stored = db.execute(
+                    "SELECT 1 FROM minhash_entries WHERE name = ? AND text = ? AND created_at >= ?",
+                    (self.name, text, now - self.ttl_seconds),
+                ).fetchone()
+                if stored is None:
+                    entry_id = db.execute(
+                        "INSERT INTO minhash_entries (name, text, signature, value, created_at) VALUES (?, ?, ?, ?, ?)",
+                        (self.name, text, signature.tobytes(), json.dumps(value), now),
+                    ).lastrowid
+                    db.executemany(
+                        "INSERT INTO minhash_bands (name, band, bucket, entry_id) VALUES (?, ?, ?, ?)",
+                        [(self.name, band, bucket, entry_id) for band, bucket in enumerate(self._buckets(signature))],
+                    )
+                    self._writes += 1
+                    if self._writes % self.evict_every == 0:
+                        self._evict(db, now)
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    def _evict(self, db, now: float) -> None:
+        cutoff = now - self.ttl_seconds
+        oldest_kept = db.execute(
+            "SELECT created_at FROM minhash_entries WHERE name = ? ORDER BY created_at DESC LIMIT 1 OFFSET ?",
+            (self.name, self.max_entries - 1),
+        ).fetchone()
+        if oldest_kept is not None:
+            cutoff = max(cutoff, oldest_kept[0])
+        db.execute(
+            "DELETE FROM minhash_bands WHERE entry_id IN ("
+            " SELECT id FROM minhash_entries WHERE name = ? AND created_at < ?)", (self.name, cutoff))
+        evicted = db.execute("DELETE FROM minhash_entries WHERE name = ? AND created_at < ?", (self.name, cutoff)).rowcount
+        self.counters["evicted"] += max(evicted, 0)
+
+    def stats(self) -> dict:
+        lookups = self.counters["hit"] + self.counters["miss"]
+        return {"hits": self.counters["hit"], "misses": self.counters["miss"],
+                "hit_rate": self.counters["hit"] / lookups if lookups else 0.0, "threshold": self.threshold}
@@ -0,0 +1,219 @@
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+from dataclasses import asdict, fields
+from typing import List
+
+import numpy as np
+from dotenv import load_dotenv
+
+from backend.internal_logic.models import Person
+from backend.internal_logic.storage import connect
+
+#load variables from .env
+load_dotenv()
+
+#how long a cached PDL query result is served before it is fetched again
+PEOPLE_CACHE_TTL_SECONDS = float(os.getenv("PEOPLE_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+#filled in per project, never stored
+_ENRICHMENT_FIELDS = ("score", "email_draft", "bio")
+_PERSON_FIELDS = {f.name for f in fields(Person)}
+
+#size of a geo index cell in degrees (~55km north-south)
+GRID_DEGREES = 0.5
+EARTH_RADIUS_KM = 6371.0
+
+_QUOTED = r"'(?:[^']|'')*'"
+_IN_LIST = re.compile(r"\bin\s*\(((?:\s*" + _QUOTED + r"\s*,?)*)\)")
+
+_conn = None
+_lock = threading.Lock()
+
+
+def _db():
+    global _conn
+    if _conn is None:
+        _conn = connect("people.sqlite3")
+        _conn.executescript("""
+            CREATE TABLE IF NOT EXISTS people (
+                linkedin_url TEXT PRIMARY KEY,
+                name TEXT,
+                location TEXT,
+                current_job_title TEXT,
+                data TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_people_job_title ON people (current_job_title COLLATE NOCASE);
+            CREATE INDEX IF NOT EXISTS idx_people_location ON people (location COLLATE NOCASE);
+
+            CREATE TABLE IF NOT EXISTS queries (
+                query_key TEXT PRIMARY KEY,
+                sql TEXT NOT NULL,
+                total INTEGER,
+                fetched_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS query_results (
+                query_key TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                linkedin_url TEXT NOT NULL,
+                PRIMARY KEY (query_key, position)
+            );
+        """)
+        #geo columns were added after the first version of the table
+        columns = {row[1] for row in _conn.execute("PRAGMA table_info(people)")}
+        for column, kind in (("latitude", "REAL"), ("longitude", "REAL"), ("grid_x", "INTEGER"), ("grid_y", "INTEGER")):
+            if column not in columns:
+                _conn.execute(f"ALTER TABLE people ADD COLUMN {column} {kind}")
+        _conn.execute("CREATE INDEX IF NOT EXISTS idx_people_grid ON people (grid_y, grid_x)")
+    return _conn
+
+
+def _cell(degrees: float) -> int:
+    return math.floor(degrees / GRID_DEGREES)
+
+
+def canonical_query(sql: str) -> str:
+    """Normalize whitespace, case and IN (...) ordering so equivalent queries compare equal."""
+    sql = " ".join(sql.lower().split()).rstrip("; ")
+
+    def sort_items(match: re.Match) -> str:
+        return "in (" + ", ".join(sorted(set(re.findall(_QUOTED, match.group(1))))) + ")"
+
+    return _IN_LIST.sub(sort_items, sql)
+
+
+def query_key(sql: str, size: int) -> str:
+    return hashlib.sha256(f"{canonical_query(sql)}|size={size}".encode("utf-8")).hexdigest()
+
+
+def _to_row(person: Person) -> dict:
+    data = asdict(person)
+    for name in _ENRICHMENT_FIELDS:
+        data[name] = None
+    return data
+
+
+def _from_row(data: str) -> Person:
+    values = json.loads(data)
+    values["past_job_title"] = [tuple(job) for job in values.get("past_job_title", [])]
+    if values.get("coordinates"):
+        values["coordinates"] = tuple(values["coordinates"])
+    return Person(**{k: v for k, v in values.items() if k in _PERSON_FIELDS})
+
+
+def save_people(people: List[Person]) -> None:
+    now = time.time()
+    rows = []
+    for p in people:
+        if not p.linkedin_url:
+            continue
+        latitude, longitude = p.coordinates or (None, None)
+        grid = (_cell(longitude), _cell(latitude)) if p.coordinates else (None, None)
+        rows.append((p.linkedin_url, p.name, str(p.location or ""), p.current_job_title, json.dumps(_to_row(p)), now,
+                     latitude, longitude, *grid))
+    with _lock:
+        _db().executemany(
+            "INSERT OR REPLACE INTO people (linkedin_url, name, location, current_job_title, data, fetched_at,"
+            " latitude, longitude, grid_x, grid_y) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+
+
+def save_query(sql: str, size: int, people: List[Person], total: int | None = None) -> None:
+    """Store the people returned for a query and remember which ones, in order."""
+    key = query_key(sql, size)
+    save_people(people)
+    with _lock:
+        db = _db()
+        db.execute("BEGIN")
+        try:
+            db.execute("DELETE FROM query_results WHERE query_key = ?", (key,))
+            db.executemany(
+                "INSERT INTO query_results (query_key, position, linkedin_url) VALUES (?, ?, ?)",
+                [(key, i, p.linkedin_url) for i, p in enumerate(people) if p.linkedin_url],
+            )
+            db.execute(
+                "INSERT OR REPLACE INTO queries (query_key, sql, total, fetched_at) VALUES (?, ?, ?, ?)",
+                (key, canonical_query(sql), total, time.time()),
+            )
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+
+
+def get_cached_query(sql: str, size: int, max_age: float | None = PEOPLE_CACHE_TTL_SECONDS) -> List[Person] | None:
+    """People previously returned for this query, or None if never seen or older than max_age."""
+    key = query_key(sql, size)
+    with _lock:
+        db = _db()
+        row = db.execute("SELECT fetched_at FROM queries WHERE query_key = ?", (key,)).fetchone()
+        if row is None or (max_age is not None and time.time() - row[0] > max_age):
+            return None
+        rows = db.execute(
+            "SELECT p.data FROM query_results r JOIN people p ON p.linkedin_url = r.linkedin_url"
+            " WHERE r.query_key = ? ORDER BY r.position",
+            (key,),
+        ).fetchall()
+    return [_from_row(data) for (data,) in rows]
+
+
+def get_person(linkedin_url: str) -> Person | None:
+    with _lock:
+        row = _db().execute("SELECT data FROM people WHERE linkedin_url = ?", (linkedin_url,)).fetchone()
+    return _from_row(row[0]) if row else None
+
+
+def find_local(job_titles: List[str], city: str | None = None, limit: int = 25) -> List[Person]:
+    """Answer a search from stored people only, matching job title and (optionally) city."""
+    if not job_titles:
+        return []
+    placeholders = ", ".join("?" for _ in job_titles)
+    sql = f"SELECT data FROM people WHERE current_job_title COLLATE NOCASE IN ({placeholders})"
+    args: list = list(job_titles)
+    if city:
+        sql += " AND location LIKE ?"
+        args.append(f"%{city}%")
+    sql += " ORDER BY fetched_at DESC LIMIT ?"
+    args.append(limit)
+    with _lock:
+        rows = _db().execute(sql, args).fetchall()
+    return [_from_row(data) for (data,) in rows]
+
+
+def haversine_km(latitude: float, longitude: float, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """Great-circle distance from one point to many, in km."""
+    lat1, lon1 = np.radians(latitude), np.radians(longitude)
+    lat2, lon2 = np.radians(latitudes), np.radians(longitudes)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def nearest(latitude: float, longitude: float, radius_km: float, limit: int = 25,
+            job_titles: List[str] | None = None) -> List[Person]:
+    """Closest stored people within radius_km, nearest first, without asking PDL."""
+    #grid cells covering the radius, then exact distances on just those rows
+    lat_span = radius_km / 111.32
+    lon_span = radius_km / max(111.32 * math.cos(math.radians(latitude)), 1e-6)
+    sql = "SELECT data, latitude, longitude FROM people WHERE grid_y BETWEEN ? AND ? AND grid_x BETWEEN ? AND ?"
+    args: list = [_cell(latitude - lat_span), _cell(latitude + lat_span),
+                  _cell(longitude - lon_span), _cell(longitude + lon_span)]
+    if job_titles:
+        sql += f" AND current_job_title COLLATE NOCASE IN ({', '.join('?' for _ in job_titles)})"
+        args += list(job_titles)
+    with _lock:
+        rows = _db().execute(sql, args).fetchall()
+    if not rows:
+        return []
+
+    distances = haversine_km(latitude, longitude,
+                             np.fromiter((row[1] for row in rows), float, len(rows)),
+                             np.fromiter((row[2] for row in rows), float, len(rows)))
+    order = np.argsort(distances, kind="stable")
+    order = order[distances[order] <= radius_km][:limit]
+    return [_from_row(rows[i][0]) for i in order]
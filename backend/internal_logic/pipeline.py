@@ -0,0 +1,125 @@
+import asyncio
+import uuid
+from contextlib import aclosing
+from dataclasses import asdict
+from typing import AsyncIterator
+
+from backend.internal_logic.audit_log import audit
+from backend.internal_logic.check_description import description_good_async, quick_check
+from backend.internal_logic.enrichment import enrich_people, iter_enriched
+from backend.internal_logic.find_people import find_people_async
+from backend.internal_logic.job_title import get_job_title_list_async
+from backend.internal_logic.metrics import span
+from backend.internal_logic.models import ProjectSubmission
+from backend.internal_logic.prerank import rank_people
+from backend.internal_logic.single_flight import SingleFlight, fingerprint
+
+
+async def proposal_events(event: ProjectSubmission, incremental: bool = False) -> AsyncIterator[dict]:
+    """Run the proposal pipeline, yielding its results as events.
+
+    Yields {"type": "feedback"} and stops when the overview needs work, otherwise
+    {"type": "job_titles"}, {"type": "candidates"} and one {"type": "person"} per
+    enriched Person. With `incremental`, people are yielded as each one finishes;
+    otherwise they are enriched together (batched scoring) and yielded in rank order.
+    """
+    proposal_id = uuid.uuid4().hex
+    #this proposal's stage timings, kept with its audit record
+    trace: list[dict] = []
+    audit.record("proposal", proposal_id=proposal_id, project_overview=event.project_overview,
+                 location=event.location.model_dump(), enrichment=event.enrichment)
+
+    #titles only depend on the overview, so start them speculatively while the
+    #description check runs and drop them if it fails. The PDL search costs credits
+    #that cancelling cannot take back, so it only starts early when the local check
+    #has already accepted the overview; otherwise it waits for the LLM check.
+    titles_task = asyncio.create_task(_job_titles(event, trace))
+    people_task = asyncio.create_task(_search_after(titles_task, event, trace)) if quick_check(
+        event.project_overview) else None
+    try:
+        with span("check_description", trace):
+            feedback = await description_good_async(event.project_overview)
+        if feedback:
+            audit.record("feedback", proposal_id=proposal_id, feedback=feedback, trace=trace)
+            yield {"type": "feedback", "feedback": feedback}
+            return
+
+        if people_task is None:
+            people_task = asyncio.create_task(_search_after(titles_task, event, trace))
+        job_titles = await titles_task
+        yield {"type": "job_titles", "job_titles": job_titles}
+        people = await people_task
+    finally:
+        #discards the speculative work on rejection or disconnect
+        _discard(titles_task)
+        if people_task is not None:
+            _discard(people_task)
+
+    #only the best few candidates are worth the LLM calls
+    with span("prerank", trace):
+        people = rank_people(people, event.project_overview)
+    yield {"type": "candidates", "count": len(people)}
+
+    if incremental:
+        enriched = []
+        with span("enrich", trace):
+            async for person in iter_enriched(people, event.project_overview, mode=event.enrichment):
+                enriched.append(person)
+                yield {"type": "person", "person": person}
+    else:
+        with span("enrich", trace):
+            enriched = await enrich_people(people, event.project_overview, mode=event.enrichment)
+        for person in enriched:
+            yield {"type": "person", "person": person}
+    audit.record("people", proposal_id=proposal_id, job_titles=job_titles,
+                 people=[asdict(person) for person in enriched], trace=trace)
+
+
+#identical proposals submitted while one is running get its result
+_in_flight = SingleFlight("proposal")
+
+
+def proposal_fingerprint(event: ProjectSubmission) -> str:
+    """Same overview, location and enrichment mode, ignoring case and spacing."""
+    return fingerprint(event.project_overview, event.location.model_dump(), event.enrichment)
+
+
+async def run_proposal(event: ProjectSubmission) -> dict:
+    """Run the whole pipeline, returning {"feedback": [...]} or {"job_titles": [...], "people": [Person, ...]}.
+
+    Concurrent identical proposals share one run (and the same Person objects).
+    """
+    return await _in_flight.run(proposal_fingerprint(event), lambda: _collect(event))
+
+
+async def _collect(event: ProjectSubmission) -> dict:
+    result = {"job_titles": [], "people": []}
+    #closed on the way out, so speculative work is cancelled now rather than when the generator is collected
+    async with aclosing(proposal_events(event)) as events:
+        async for update in events:
+            if update["type"] == "feedback":
+                return {"feedback": update["feedback"]}
+            if update["type"] == "job_titles":
+                result["job_titles"] = update["job_titles"]
+            elif update["type"] == "person":
+                result["people"].append(update["person"])
+    return result
+
+
+async def _job_titles(event: ProjectSubmission, trace: list[dict]) -> list:
+    with span("job_titles", trace):
+        return await get_job_title_list_async(event.project_overview)
+
+
+async def _search_after(titles_task: asyncio.Task, event: ProjectSubmission, trace: list[dict]) -> list:
+    job_titles = await titles_task
+    with span("pdl_search", trace):
+        return await find_people_async(job_titles, event.location)
+
+
+def _discard(task: asyncio.Task) -> None:
+    if not task.done():
+        task.cancel()
+    elif not task.cancelled():
+        #mark a failure we no longer care about as seen
+        task.exception()
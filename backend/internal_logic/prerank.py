@@ -0,0 +1,87 @@
+import os
+import re
+from typing import List
+
+import numpy as np
+from dotenv import load_dotenv
+
+from backend.internal_logic.models import Person
+
+#load variables from .env
+load_dotenv()
+
+#only this many candidates go on to the LLM stages
+PRERANK_TOP_K = int(os.getenv("PRERANK_TOP_K", "5"))
+
+#BM25 parameters
+K1 = 1.2
+B = 0.75
+
+#how much a term match counts in each profile field
+FIELD_WEIGHTS = {
+    "current_job_title": 3.0,
+    "past_job_title": 1.5,
+    "skills": 1.0,
+    "summary": 1.0,
+    "interests": 0.5,
+}
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or our that the their this to we will with"
+    " who want wants need needs looking help".split()
+)
+
+
+#cheap stemming: "sustainable"/"sustainability", "garden"/"gardening" share a prefix
+STEM_LENGTH = 6
+
+
+def tokenize(text: str) -> List[str]:
+    return [word[:STEM_LENGTH] for word in _WORD.findall(text.lower()) if word not in _STOPWORDS and len(word) > 1]
+
+
+def _field_text(person: Person, field: str) -> str:
+    value = getattr(person, field)
+    if field == "past_job_title":
+        return " ".join(str(job[0]) if isinstance(job, (list, tuple)) else str(job) for job in value or [])
+    if isinstance(value, (list, tuple)):
+        return " ".join(map(str, value))
+    return value or ""
+
+
+def bm25_scores(people: List[Person], event_summary: str) -> np.ndarray:
+    """Field-weighted BM25 score of every person's profile against the project overview."""
+    query = sorted(set(tokenize(event_summary)))
+    if not people or not query:
+        return np.zeros(len(people))
+    column = {term: j for j, term in enumerate(query)}
+
+    #weighted term frequencies, only for the query vocabulary (docs x query terms)
+    tf = np.zeros((len(people), len(query)))
+    lengths = np.zeros(len(people))
+    for i, person in enumerate(people):
+        for field, weight in FIELD_WEIGHTS.items():
+            words = tokenize(_field_text(person, field))
+            lengths[i] += weight * len(words)
+            for word in words:
+                j = column.get(word)
+                if j is not None:
+                    tf[i, j] += weight
+
+    n = len(people)
+    df = np.count_nonzero(tf, axis=0)
+    idf = np.log1p((n - df + 0.5) / (df + 0.5))
+    avg_length = lengths.mean() or 1.0
+    norm = K1 * (1 - B + B * lengths / avg_length)
+    return ((tf * (K1 + 1)) / (tf + norm[:, None]) * idf).sum(axis=1)
+
+
+def rank_people(people: List[Person], event_summary: str, top_k: int | None = None) -> List[Person]:
+    """Best `top_k` people for the project by local BM25 score, best first."""
+    top_k = top_k or PRERANK_TOP_K
+    if len(people) <= 1:
+        return people[:top_k]
+    scores = bm25_scores(people, event_summary)
+    order = np.argsort(-scores, kind="stable")[:top_k]
+    return [people[i] for i in order]
@@ -0,0 +1,94 @@
+import os
+import re
+from typing import List
+
+from dotenv import load_dotenv
+
+from backend.internal_logic import metrics
+from backend.internal_logic.models import Person
+from backend.internal_logic.prerank import tokenize
+from backend.internal_logic.tokens import estimate_tokens
+
+#load variables from .env
+load_dotenv()
+
+#most (estimated) tokens of profile detail put in a person prompt; 0 sends everything
+PROMPT_PROFILE_TOKEN_BUDGET = int(os.getenv("PROMPT_PROFILE_TOKEN_BUDGET", "250"))
+
+#which list fields win when items match the overview equally well (after position, so fields take turns)
+_FIELD_PRIORITY = {"past_job_title": 0, "skills": 1, "summary": 2, "interests": 3}
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+
+PROMPT_TOKENS = metrics.Counter("prompt_profile_tokens_total",
+                                "Estimated profile tokens per person prompt, sent and trimmed by the budget.",
+                                ("stage", "kind"))
+
+
+def _past_job(job) -> str:
+    if isinstance(job, (list, tuple)) and len(job) == 2:
+        title, days = job
+        years = days // 365
+        return f"{title} (ended {years} year{'s' if years > 1 else ''} ago)" if years else f"{title} (ended this year)"
+    return str(job)
+
+
+def _items(person: Person) -> dict[str, List[str]]:
+    summary = (person.summary or "").strip()
+    return {
+        "skills": [str(skill) for skill in person.skills or []],
+        "interests": [str(interest) for interest in person.interests or []],
+        "summary": [sentence for sentence in _SENTENCE.split(summary) if sentence] if summary else [],
+        "past_job_title": [_past_job(job) for job in person.past_job_title or []],
+    }
+
+
+def _render(person: Person, items: dict[str, List[str]]) -> str:
+    return "\n".join([
+        f"Name: {person.name}",
+        f"Current Job Title: {person.current_job_title}",
+        f"Company Name: {person.company_name}",
+        f"Industry: {person.industry}",
+        f"Skills: {', '.join(items['skills'])}",
+        f"Interests: {', '.join(items['interests'])}",
+        f"LinkedIn Bio: {' '.join(items['summary'])}",
+        f"Past job title(s): {'; '.join(items['past_job_title'])}",
+    ])
+
+
+def person_context(person: Person, event_summary: str, stage: str = "", budget: int | None = None) -> str:
+    """The person's profile as prompt lines, keeping the skills, interests, bio sentences and
+    past jobs most related to the overview within `budget` estimated tokens.
+
+    Name, title, company and industry are always kept; the rest is ranked by how many
+    (stemmed) words it shares with the overview, then taken from each field in turn,
+    and printed in its original order.
+    """
+    budget = PROMPT_PROFILE_TOKEN_BUDGET if budget is None else budget
+    items = _items(person)
+    full = _render(person, items)
+    full_tokens = estimate_tokens(full)
+    if not budget or full_tokens <= budget:
+        PROMPT_TOKENS.inc(full_tokens, stage=stage, kind="sent")
+        return full
+
+    overview = set(tokenize(event_summary))
+    ranked = sorted(
+        ((field, i, item) for field, values in items.items() for i, item in enumerate(values)),
+        key=lambda unit: (-len(overview.intersection(tokenize(unit[2]))), unit[1], _FIELD_PRIORITY[unit[0]]),
+    )
+    used = estimate_tokens(_render(person, {field: [] for field in items}))
+    kept = set()
+    for field, i, item in ranked:
+        #separators and the item itself
+        cost = estimate_tokens(item) + 1
+        if used + cost > budget:
+            continue
+        kept.add((field, i))
+        used += cost
+
+    text = _render(person, {field: [item for i, item in enumerate(values) if (field, i) in kept]
+                            for field, values in items.items()})
+    sent = estimate_tokens(text)
+    PROMPT_TOKENS.inc(sent, stage=stage, kind="sent")
+    PROMPT_TOKENS.inc(max(full_tokens - sent, 0), stage=stage, kind="saved")
+    return text
@@ -0,0 +1,291 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, TypeVar
+
+import httpx
+from dotenv import load_dotenv
+
+from backend.internal_logic import metrics
+from backend.internal_logic.storage import connect
+
+#load variables from .env
+load_dotenv()
+
+#limits per provider and model, per minute (0 turns a limit off)
+OPENAI_RPM = float(os.getenv("OPENAI_RPM", "5000"))
+OPENAI_TPM = float(os.getenv("OPENAI_TPM", "450000"))
+PDL_RPM = float(os.getenv("PDL_RPM", "100"))
+#retries on 429/5xx and connection errors, backing off exponentially with full jitter
+RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "4"))
+RATE_LIMIT_BACKOFF_SECONDS = float(os.getenv("RATE_LIMIT_BACKOFF_SECONDS", "1"))
+RATE_LIMIT_MAX_BACKOFF_SECONDS = float(os.getenv("RATE_LIMIT_MAX_BACKOFF_SECONDS", "30"))
+#keep bucket levels and 429 pauses in SQLite so all server worker processes share one budget
+RATE_LIMIT_SHARED = os.getenv("RATE_LIMIT_SHARED", "0") == "1"
+
+#lower runs first: someone waiting on a proposal beats the background job queue
+INTERACTIVE, BACKGROUND = 0, 1
+priority: contextvars.ContextVar[int] = contextvars.ContextVar("priority", default=INTERACTIVE)
+
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+#non-head waiters look again this often
+_POLL_SECONDS = 0.05
+
+RATE_LIMIT_WAIT = metrics.Histogram("rate_limit_wait_seconds", "Time calls waited for a rate limit slot.",
+                                    ("provider", "priority"))
+RATE_LIMIT_RETRIES = metrics.Counter("rate_limit_retries_total", "Retried provider calls by status.",
+                                     ("provider", "status"))
+
+T = TypeVar("T")
+
+
+class _Bucket:
+    """Token bucket refilled continuously at `per_minute`, holding at most a minute's worth."""
+
+    def __init__(self, per_minute: float, now: float):
+        self.rate = per_minute / 60
+        self.capacity = per_minute
+        self.level = per_minute
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        if not self.rate:
+            return 0.0
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        #requests bigger than the bucket just wait for a full one
+        return max(0.0, (min(amount, self.capacity) - self.level) / self.rate)
+
+    def take(self, amount: float) -> None:
+        if self.rate:
+            self.level -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits shared by every caller of one provider/model.
+
+    Callers queue by (priority, arrival); only the head of the queue may take capacity,
+    so background work never jumps ahead of an interactive proposal. A 429 pauses
+    everyone until its Retry-After has passed.
+
+    With `shared`, the buckets and the pause live in a SQLite row named `name`, so
+    every process using that name draws on the same budget (the queue stays per process).
+    """
+
+    def __init__(self, provider: str, requests_per_minute: float, tokens_per_minute: float = 0,
+                 shared: bool = RATE_LIMIT_SHARED, name: str | None = None):
+        self.provider = provider
+        self.shared = shared
+        self.name = name or provider
+        #processes only agree on wall clock time
+        self._clock = time.time if shared else time.monotonic
+        self.requests = _Bucket(requests_per_minute, self._clock())
+        self.tokens = _Bucket(tokens_per_minute, self._clock())
+        self.blocked_until = 0.0
+        self._waiters: list[list] = []
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+
+    def _enqueue(self) -> list:
+        entry = [priority.get(), next(self._order)]
+        with self._lock:
+            heapq.heappush(self._waiters, entry)
+        return entry
+
+    def _try_take(self, entry: list, tokens: float) -> float:
+        """Take capacity for `entry` if it is at the head and the buckets allow; otherwise seconds to wait."""
+        with self._lock:
+            if self._waiters[0] is not entry:
+                return _POLL_SECONDS
+            wait = self._shared_update(self._take, tokens) if self.shared else self._take(tokens)
+            if wait > 0:
+                return wait
+            heapq.heappop(self._waiters)
+            return 0.0
+
+    def _take(self, tokens: float) -> float:
+        now = self._clock()
+        wait = max(self.blocked_until - now, self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+        if wait <= 0:
+            self.requests.take(1)
+            self.tokens.take(tokens)
+        return wait
+
+    def _block(self, delay: float) -> None:
+        self.blocked_until = max(self.blocked_until, self._clock() + delay)
+
+    def _shared_update(self, update: Callable[..., T], *args) -> T:
+        """Run `update` on the state stored for this limiter, inside one write transaction."""
+        with _shared_lock:
+            db = _shared_db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute(
+                    "SELECT requests_level, requests_updated, tokens_level, tokens_updated, blocked_until"
+                    " FROM rate_limit_state WHERE name = ?", (self.name,)
+                ).fetchone()
+                if row is not None:
+                    (self.requests.level, self.requests.updated, self.tokens.level, self.tokens.updated,
+                     self.blocked_until) = row
+                result = update(*args)
+                db.execute(
+                    "INSERT OR REPLACE INTO rate_limit_state (name, requests_level, requests_updated, tokens_level,"
+                    " tokens_updated, blocked_until) VALUES (?, ?, ?, ?, ?, ?)",
+                    (self.name, self.requests.level, self.requests.updated, self.tokens.level, self.tokens.updated,
+                     self.blocked_until),
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return result
+
+    def _leave(self, entry: list) -> None:
+        with self._lock:
+            if entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+
+    async def acquire(self, tokens: float = 0) -> None:
+        start = time.monotonic()
+        entry = self._enqueue()
+        try:
+            #the shared state is a SQLite write transaction, which must not block the loop
+            while (wait := await asyncio.to_thread(self._try_take, entry, tokens) if self.shared
+                   else self._try_take(entry, tokens)) > 0:
+                await asyncio.sleep(wait)
+        except BaseException:
+            self._leave(entry)
+            raise
+        RATE_LIMIT_WAIT.observe(time.monotonic() - start, provider=self.provider, priority=entry[0])
+
+    def acquire_sync(self, tokens: float = 0) -> None:
+        start = time.monotonic()
+        entry = self._enqueue()
+        try:
+            while (wait := self._try_take(entry, tokens)) > 0:
+                time.sleep(wait)
+        except BaseException:
+            self._leave(entry)
+            raise
+        RATE_LIMIT_WAIT.observe(time.monotonic() - start, provider=self.provider, priority=entry[0])
+
+    def backoff(self, error: BaseException, attempt: int) -> float | None:
+        """Seconds to wait before retrying after `error`, or None if it should not be retried."""
+        status = _status(error)
+        if status is None and not _connection_error(error):
+            return None
+        RATE_LIMIT_RETRIES.inc(provider=self.provider, status=status or "connection")
+        retry_after = _retry_after(error)
+        delay = retry_after if retry_after is not None else random.uniform(
+            0, min(RATE_LIMIT_MAX_BACKOFF_SECONDS, RATE_LIMIT_BACKOFF_SECONDS * 2 ** attempt))
+        if status == 429:
+            #the provider is telling everyone to slow down, not just this call
+            with self._lock:
+                if self.shared:
+                    self._shared_update(self._block, delay)
+                else:
+                    self._block(delay)
+        return delay
+
+    async def run(self, call: Callable[[], Awaitable[T]], tokens: float = 0,
+                  retries: int = RATE_LIMIT_MAX_RETRIES) -> T:
+        """Wait for a slot, then await call(), retrying retryable failures with backoff."""
+        for attempt in itertools.count():
+            await self.acquire(tokens)
+            try:
+                return await call()
+            except Exception as e:
+                if attempt >= retries:
+                    raise
+                delay = await asyncio.to_thread(self.backoff, e, attempt) if self.shared else self.backoff(e, attempt)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+
+    def run_sync(self, call: Callable[[], T], tokens: float = 0, retries: int = RATE_LIMIT_MAX_RETRIES) -> T:
+        for attempt in itertools.count():
+            self.acquire_sync(tokens)
+            try:
+                return call()
+            except Exception as e:
+                delay = self.backoff(e, attempt) if attempt < retries else None
+                if delay is None:
+                    raise
+            time.sleep(delay)
+
+
+def _response(error: BaseException):
+    return getattr(error, "response", None)
+
+
+def _status(error: BaseException) -> int | None:
+    #openai.APIStatusError and httpx.HTTPStatusError both carry the response
+    status = getattr(error, "status_code", None) or getattr(_response(error), "status_code", None)
+    return status if status in RETRY_STATUSES else None
+
+
+def _connection_error(error: BaseException) -> bool:
+    return isinstance(error, httpx.TransportError) or type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+def _retry_after(error: BaseException) -> float | None:
+    headers = getattr(_response(error), "headers", None) or {}
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), RATE_LIMIT_MAX_BACKOFF_SECONDS)
+
+
+_limiters: dict[tuple[str, str], RateLimiter] = {}
+_limiters_lock = threading.Lock()
+_shared_conn = None
+_shared_lock = threading.Lock()
+
+
+def _shared_db():
+    #opened lazily, so a preloaded app forks before any connection exists
+    global _shared_conn
+    if _shared_conn is None:
+        _shared_conn = connect("rate_limits.sqlite3")
+        _shared_conn.execute("""
+            CREATE TABLE IF NOT EXISTS rate_limit_state (
+                name TEXT PRIMARY KEY,
+                requests_level REAL NOT NULL,
+                requests_updated REAL NOT NULL,
+                tokens_level REAL NOT NULL,
+                tokens_updated REAL NOT NULL,
+                blocked_until REAL NOT NULL
+            )""")
+    return _shared_conn
+
+
+def limiter(provider: str, model: str = "") -> RateLimiter:
+    """The shared limiter for one provider and model, e.g. limiter("openai", "gpt-4o")."""
+    with _limiters_lock:
+        if (provider, model) not in _limiters:
+            name = f"{provider}:{model}" if model else provider
+            if provider == "openai":
+                _limiters[provider, model] = RateLimiter(provider, OPENAI_RPM, OPENAI_TPM, name=name)
+            else:
+                _limiters[provider, model] = RateLimiter(provider, PDL_RPM, name=name)
+        return _limiters[provider, model]
@@ -1,34 +1,45 @@
-from idlelib.configdialog import is_int
 from typing import List
-from openai import OpenAI
+import asyncio
 import os
+
 from dotenv import load_dotenv
-import ast
 
-from backend.internal_logic.models import Person
+from backend.internal_logic.llm_client import (acomplete, acomplete_structured, complete, complete_structured,
+                                              parse_output, response_format)
+from backend.internal_logic.models import Person, RelevanceScore, RelevanceScores
+from backend.internal_logic.tokens import estimate_message_tokens, estimate_tokens
 
 #load variables from .env
 load_dotenv()
 
-openai_api_key = os.getenv("OPENAI_API_KEY")
-client = OpenAI(api_key=openai_api_key)
+#max prompt tokens for one batched scoring request, bigger batches get split
+SCORE_BATCH_TOKEN_BUDGET = int(os.getenv("SCORE_BATCH_TOKEN_BUDGET", "6000"))
+
+
 def make_score(person: Person, event_summary: str) -> int:
-    person.score = get_relevance_score(event_summary,person.bio)
-    if is_int(person.score):
-        return person.score
-    else:
-        person.score = get_relevance_score(event_summary, person.bio)
-        if is_int(person.score):
-            return person.score
-        else:
-            person.score = get_relevance_score(event_summary, person.bio)
-            if is_int(person.score):
-                return person.score
-            else:
-                person.score = 0
-                return person.score
-
-def get_relevance_score(event_summary: str, bio: str) -> int:
+    #0 when even the retry came back invalid
+    person.score = get_relevance_score(event_summary, person.bio) or 0
+    return person.score
+
+
+async def make_score_async(person: Person, event_summary: str) -> int:
+    person.score = await get_relevance_score_async(event_summary, person.bio) or 0
+    return person.score
+
+
+def get_relevance_score(event_summary: str, bio: str) -> int | None:
+    result = complete_structured("relevance_score", _messages(event_summary, bio), RelevanceScore, model="gpt-4o",
+                                 temperature=0)
+    return result.score if result else None
+
+
+async def get_relevance_score_async(event_summary: str, bio: str) -> int | None:
+    result = await acomplete_structured("relevance_score", _messages(event_summary, bio), RelevanceScore,
+                                        model="gpt-4o", temperature=0)
+    return result.score if result else None
+
+
+def _messages(event_summary: str, bio: str) -> list[dict]:
     prompt = f"""
         You are helping evaluate the relevance of potential contacts for a sustainability-related community project.
 
@@ -40,30 +51,116 @@ def get_relevance_score(event_summary: str, bio: str) -> int:
         Analyze how relevant and useful this person would be in supporting or enabling the project.
 
         Instructions:
-        Return a single integer between 1 and 100, where:
+        Give a single integer score between 1 and 100, where:
         - 1 means not relevant at all,
         - 100 means extremely relevant and likely to help.
 
-        Only return the integer. Do not include any explanation, formatting, or extra text.
-
         Project Summary:
         {event_summary}
 
         Person Summary:
         {bio}
         """
-    print(prompt)
 
-    response = client.chat.completions.create(model="gpt-4o",
-    messages=[
+    return [
         {"role": "system", "content": "You help find sponsors for sustainability-related community projects."},
         {"role": "user", "content": prompt}
-    ],
-    temperature=0)
+    ]
+
+
+def make_scores(people: List[Person], event_summary: str) -> List[int]:
+    """Score many people with one request per chunk, falling back to make_score for any left unscored."""
+    scores = []
+    for chunk in _chunks(event_summary, [person.bio for person in people]):
+        scores += get_relevance_scores(event_summary, [people[i].bio for i in chunk])
+    for person, score in zip(people, scores):
+        person.score = score if score is not None else make_score(person, event_summary)
+    return [person.score for person in people]
+
+
+async def make_scores_async(people: List[Person], event_summary: str) -> List[int]:
+    chunks = _chunks(event_summary, [person.bio for person in people])
+    results = await asyncio.gather(
+        *(get_relevance_scores_async(event_summary, [people[i].bio for i in chunk]) for chunk in chunks)
+    )
+    retries = []
+    for person, score in zip(people, (score for chunk_scores in results for score in chunk_scores)):
+        person.score = score
+        if score is None:
+            retries.append(make_score_async(person, event_summary))
+    await asyncio.gather(*retries)
+    return [person.score for person in people]
+
+
+def get_relevance_scores(event_summary: str, bios: List[str]) -> List[int | None]:
+    content = complete("relevance_scores", _batch_messages(event_summary, bios), model="gpt-4o", temperature=0,
+                       max_tokens=20 * len(bios) + 50, response_format=response_format(RelevanceScores))
+    return _parse_scores(content, len(bios))
+
+
+async def get_relevance_scores_async(event_summary: str, bios: List[str]) -> List[int | None]:
+    content = await acomplete("relevance_scores", _batch_messages(event_summary, bios), model="gpt-4o", temperature=0,
+                              max_tokens=20 * len(bios) + 50, response_format=response_format(RelevanceScores))
+    return _parse_scores(content, len(bios))
+
+
+def _chunks(event_summary: str, bios: List[str], budget: int = None) -> List[List[int]]:
+    """Split candidate indexes into groups whose batched prompt fits the token budget."""
+    budget = budget or SCORE_BATCH_TOKEN_BUDGET
+    base = estimate_message_tokens(_batch_messages(event_summary, []))
+    chunks, current, used = [], [], base
+    for i, bio in enumerate(bios):
+        cost = estimate_tokens(bio or "") + 10
+        if current and used + cost > budget:
+            chunks.append(current)
+            current, used = [], base
+        current.append(i)
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _parse_scores(content: str, count: int) -> List[int | None]:
+    #no retry here: anyone left unscored goes through make_score
+    scores: List[int | None] = [None] * count
+    result = parse_output("relevance_scores", content, RelevanceScores)
+    for entry in result.scores if result else []:
+        if 1 <= entry.id <= count:
+            scores[entry.id - 1] = entry.score
+    return scores
+
+
+def _batch_messages(event_summary: str, bios: List[str]) -> list[dict]:
+    candidates = "\n\n".join(f"Candidate {i}:\n{bio}" for i, bio in enumerate(bios, start=1))
+    prompt = f"""
+        You are helping evaluate the relevance of potential contacts for a sustainability-related community project.
 
-    content = response.choices[0].message.content
+        Given:
+        - A summary of the project idea.
+        - Numbered summaries of potential sponsors or contact people.
+
+        Your task:
+        Analyze how relevant and useful each person would be in supporting or enabling the project.
+
+        Instructions:
+        Give every candidate a single integer between 1 and 100, where:
+        - 1 means not relevant at all,
+        - 100 means extremely relevant and likely to help.
+
+        Return one {{"id", "score"}} entry per candidate, using the candidate's number as the id.
+
+        Project Summary:
+        {event_summary}
+
+        {candidates}
+        """
+
+    return [
+        {"role": "system", "content": "You help find sponsors for sustainability-related community projects."},
+        {"role": "user", "content": prompt}
+    ]
 
-    return content
 
 if __name__ == "__main__":
     event_summary = "We are organizing a community-led initiative to transform an abandoned lot into a green space that includes a community garden, native plant landscaping, and educational signage about local ecology. The goal is to improve food access, promote environmental awareness, and create a safe, beautiful space for residents to gather. We are seeking support with land use approvals, funding, volunteer coordination, and long-term maintenance partnerships."
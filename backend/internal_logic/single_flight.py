@@ -0,0 +1,63 @@
+import asyncio
+import hashlib
+import json
+import re
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+from backend.internal_logic import metrics
+
+COALESCED = metrics.Counter("coalesced_total", "Calls that joined an identical call already in flight.", ("kind",))
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Concurrent calls with the same key share one in-flight computation.
+
+    The first caller starts the work as a task; callers arriving before it finishes
+    await the same task. A caller that goes away does not cancel the work for the
+    others, only the last one leaving does.
+    """
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        #(event loop, key) -> [task, number of callers waiting]
+        self._calls: dict[tuple, list] = {}
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        slot = (asyncio.get_running_loop(), key)
+        call = self._calls.get(slot)
+        if call is None:
+            task = asyncio.ensure_future(factory())
+            call = self._calls[slot] = [task, 0]
+            task.add_done_callback(lambda _: self._calls.pop(slot, None))
+        else:
+            COALESCED.inc(kind=self.kind)
+        task = call[0]
+        call[1] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if call[1] == 1 and not task.done():
+                task.cancel()
+            raise
+        finally:
+            call[1] -= 1
+
+
+def fingerprint(*parts) -> str:
+    """Stable key for values that should count as the same request: case and whitespace are ignored in strings."""
+    def normalize(value):
+        if isinstance(value, str):
+            return re.sub(r"\s+", " ", value).strip().lower()
+        if isinstance(value, dict):
+            return {k: normalize(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [normalize(v) for v in value]
+        return value
+
+    payload = json.dumps(normalize(list(parts)), sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
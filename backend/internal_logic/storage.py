@@ -0,0 +1,54 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    #no multi-worker server without fork, so a thread lock is enough
+    fcntl = None
+
+from dotenv import load_dotenv
+
+#load variables from .env
+load_dotenv()
+
+#all local SQLite databases (caches, stores) live here
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".data"))
+
+
+def connect(db_name: str) -> sqlite3.Connection:
+    """Open (creating if needed) a SQLite database in DATA_DIR, in autocommit + WAL mode."""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(DATA_DIR, db_name), check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+
+@contextmanager
+def file_lock(path: str):
+    """Exclusive lock shared by every server worker process (a no-op without fcntl)."""
+    if fcntl is None:
+        yield
+        return
+    with open(path, "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def process_alive(pid: int | None) -> bool:
+    """Whether another process with this pid is still running."""
+    if not pid or pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
@@ -0,0 +1,17 @@
+import re
+from typing import Iterable
+
+#words, numbers and single punctuation marks, roughly how BPE tokenizers split English text
+_PIECE = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Local estimate of the number of GPT tokens in `text` (long words count as several)."""
+    if not text:
+        return 0
+    return sum((len(piece) + 3) // 4 if piece.isalpha() else 1 for piece in _PIECE.findall(text))
+
+
+def estimate_message_tokens(messages: Iterable[dict]) -> int:
+    #each chat message carries a few tokens of framing
+    return sum(4 + estimate_tokens(message.get("content") or "") for message in messages)
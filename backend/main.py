@@ -1,9 +1,38 @@
+import asyncio
+import os
+import sys
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from backend.external_logic.user_event import router
+from backend.internal_logic import find_people, jobs, metrics
+from backend.internal_logic.audit_log import audit
+from backend.internal_logic.llm_client import aclose_client, close_client
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Resume queued proposal jobs
+    await jobs.pool.start()
+    # Publish this worker's metrics for the others' /metrics
+    if metrics.METRICS_SHARED:
+        metrics.shared.start()
+    yield
+    await jobs.pool.stop()
+    if metrics.METRICS_SHARED:
+        metrics.shared.stop()
+    # Release pooled LLM connections
+    await aclose_client()
+    close_client()
+    find_people.close_client()
+    # Write out queued audit records
+    audit.close()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -17,8 +46,18 @@ app.add_middleware(
 # Include Routers
 app.include_router(router, prefix="/api", tags=["Project Proposal"])
 
-# Main entry point
+
+# Prometheus scrape target
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    #shared mode reads every worker's snapshot file, so that stays off the event loop
+    return PlainTextResponse(await asyncio.to_thread(metrics.render), media_type=metrics.CONTENT_TYPE)
+
+# Main entry point: reloading dev server, or SERVER_MODE=production for gunicorn workers (see gunicorn.conf.py)
 if __name__ == "__main__":
+    if os.getenv("SERVER_MODE") == "production":
+        config = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gunicorn.conf.py")
+        os.execv(sys.executable, [sys.executable, "-m", "gunicorn", "-c", config, "backend.main:app"])
     print("Starting server...")
-    uvicorn.run(app, host="0.0.0.0", port=8001, reload=True)
+    uvicorn.run("backend.main:app", host="0.0.0.0", port=8001, reload=True)
     print("Server running?")
@@ -0,0 +1,30 @@
+import json
+import os
+
+from backend.internal_logic import storage
+from backend.internal_logic.audit_log import AuditLog
+
+
+def test_audit_log_batches_records_in_background(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_DIR", str(tmp_path))
+    log = AuditLog(flush_seconds=0.05, enabled=True)
+    for i in range(5):
+        log.record("pdl_query", sql=f"select {i}")
+    log.close()
+
+    with open(log.path) as f:
+        entries = [json.loads(line) for line in f]
+    assert [entry["sql"] for entry in entries] == [f"select {i}" for i in range(5)]
+    assert all(entry["type"] == "pdl_query" for entry in entries)
+
+
+def test_audit_log_rotates_by_size(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_DIR", str(tmp_path))
+    log = AuditLog(max_bytes=200, backups=2, batch=1, flush_seconds=0.05, enabled=True)
+    for i in range(20):
+        log.record("proposal", project_overview="x" * 50)
+    log.close()
+
+    files = sorted(name for name in os.listdir(tmp_path) if not name.endswith(".lock"))
+    assert files == ["audit.ndjson", "audit.ndjson.1", "audit.ndjson.2"]
+    assert all(os.path.getsize(tmp_path / name) <= 200 for name in files)
@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+
+from backend.benchmark.fake_servers import FakeServer, openai_app, pdl_app
+from backend.benchmark.run import summarize
+from backend.internal_logic import find_people, llm_client, person_store, storage
+from backend.internal_logic.models import Location, ProjectSubmission
+from backend.internal_logic.pipeline import proposal_events
+
+
+@pytest.fixture
+def fake_apis(tmp_path, monkeypatch):
+    with FakeServer(openai_app()) as openai, FakeServer(pdl_app()) as pdl:
+        monkeypatch.setattr(storage, "DATA_DIR", str(tmp_path))
+        monkeypatch.setattr(person_store, "_conn", None)
+        monkeypatch.setattr(llm_client, "LLM_CACHE_ENABLED", False)
+        monkeypatch.setattr(find_people, "PDL_OFFLINE", False)
+        monkeypatch.setattr(find_people, "PDL_BASE_URL", f"{pdl.url}/v5")
+        monkeypatch.setattr(find_people, "CLIENT", None)
+        monkeypatch.setenv("OPENAI_API_KEY", "fake")
+        monkeypatch.setenv("OPENAI_BASE_URL", f"{openai.url}/v1")
+        yield
+        find_people.close_client()
+
+
+def test_pipeline_runs_against_fake_apis(fake_apis):
+    event = ProjectSubmission(project_overview="community garden", location=Location(city="Charlotte", state="NC"))
+
+    async def run():
+        try:
+            return [update async for update in proposal_events(event)]
+        finally:
+            await llm_client.aclose_client()
+
+    updates = asyncio.run(run())
+    people = [update["person"] for update in updates if update["type"] == "person"]
+    assert people and all(person.bio and person.score for person in people)
+    assert len({person.linkedin_url for person in people}) == len(people)
+
+
+def test_summarize_percentiles():
+    summary = summarize([i / 1000 for i in range(1, 101)], errors=1, elapsed=2.0)
+    assert summary["p50_ms"] == 50.5 and summary["p99_ms"] == 99.0
+    assert summary["rps"] == 50.0 and summary["errors"] == 1
@@ -0,0 +1,220 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from backend.internal_logic import find_people, job_title, llm_client, near_duplicates, person_store, pipeline, storage
+from backend.internal_logic.llm_cache import LLMCache, cache_key
+from backend.internal_logic.models import Location, Person, ProjectSubmission
+from backend.internal_logic.near_duplicates import MinHashIndex
+from backend.internal_logic.single_flight import SingleFlight
+
+
+@pytest.fixture
+def llm_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_DIR", str(tmp_path))
+    return LLMCache(db_name="test_cache.sqlite3", ttl_seconds=60, max_entries=2, memory_entries=1, evict_every=3)
+
+
+@pytest.fixture
+def people_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(person_store, "_conn", None)
+
+
+def test_cache_key_depends_on_temperature():
+    messages = [{"role": "user", "content": "hi"}]
+    assert cache_key("bio", "gpt-4o", messages, 0) == cache_key("bio", "gpt-4o", messages, 0)
+    assert cache_key("bio", "gpt-4o", messages, 0) != cache_key("bio", "gpt-4o", messages, 0.6)
+
+
+def test_llm_cache_hits_and_evicts(llm_cache):
+    assert llm_cache.get("bio", "a") is None
+    llm_cache.set("bio", "a", "first")
+    llm_cache.set("bio", "b", "second")
+    assert llm_cache.get("bio", "b") == "second"  # memory tier
+    assert llm_cache.get("bio", "a") == "first"   # disk tier
+    llm_cache.set("bio", "c", "third")            # third write: evicts least recently used ("b")
+    llm_cache._memory.clear()
+    assert llm_cache.get("bio", "b") is None
+    assert llm_cache.stats()["bio"] == {"miss": 2, "memory_hit": 1, "disk_hit": 1}
+
+
+def test_llm_cache_expiry_uses_an_index(llm_cache):
+    llm_cache.set("bio", "a", "first")
+    plan = llm_cache._db().execute("EXPLAIN QUERY PLAN DELETE FROM llm_cache WHERE created_at < ?", (0,)).fetchall()
+    assert "idx_llm_cache_created" in str(plan)
+
+
+def test_llm_cache_ttl(llm_cache):
+    llm_cache.ttl_seconds = 0
+    llm_cache.set("relevance_score", "k", "42")
+    assert llm_cache.get("relevance_score", "k") is None
+
+
+def test_canonical_query_ignores_title_order_and_spacing():
+    a = "SELECT * FROM person\n    WHERE job_title IN ('Urban Planner', 'Chief Sustainability Officer (CSO)');"
+    b = "select * from person where job_title in ('chief sustainability officer (cso)','urban planner')"
+    assert person_store.canonical_query(a) == person_store.canonical_query(b)
+
+
+def test_person_store_round_trip(people_db):
+    sql = "SELECT * FROM person WHERE job_title IN ('urban planner');"
+    person = Person(name="Ann", bio="not stored", current_job_title="urban planner",
+                    location="charlotte, north carolina", linkedin_url="https://linkedin.com/in/ann",
+                    past_job_title=[("planner", 100)])
+    assert person_store.get_cached_query(sql, 2) is None
+
+    person_store.save_query(sql, 2, [person], total=1)
+
+    [cached] = person_store.get_cached_query(sql, 2)
+    assert cached.name == "Ann" and cached.bio is None
+    assert cached.past_job_title == [("planner", 100)]
+    assert person_store.get_cached_query(sql, 2, max_age=-1) is None
+    assert person_store.find_local(["Urban Planner"], city="charlotte")[0].linkedin_url == person.linkedin_url
+
+
+def test_single_flight_shares_one_call():
+    flights = SingleFlight("test")
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def run():
+        first = asyncio.ensure_future(flights.run("k", work))
+        leaving = asyncio.ensure_future(flights.run("k", work))
+        await asyncio.sleep(0.01)
+        #one caller going away leaves the work running for the other
+        leaving.cancel()
+        return await asyncio.gather(first, flights.run("k", work))
+
+    assert asyncio.run(run()) == ["done", "done"]
+    assert len(calls) == 1 and flights.in_flight() == 0
+
+
+def test_identical_proposals_share_one_run(monkeypatch):
+    runs = []
+
+    async def events(event, incremental=False):
+        runs.append(event)
+        await asyncio.sleep(0.05)
+        yield {"type": "job_titles", "job_titles": ["urban planner"]}
+        yield {"type": "person", "person": Person(name="Ann")}
+
+    monkeypatch.setattr(pipeline, "proposal_events", events)
+    location = Location(city="Charlotte", state="NC")
+    first = ProjectSubmission(project_overview="A community  garden", location=location)
+    again = ProjectSubmission(project_overview="a community garden ", location=location)
+
+    async def run():
+        return await asyncio.gather(pipeline.run_proposal(first), pipeline.run_proposal(again))
+
+    one, two = asyncio.run(run())
+    assert len(runs) == 1
+    assert one is two and one["people"][0].name == "Ann"
+
+
+OVERVIEW = ("We are organizing a community-led initiative to transform an abandoned lot into a green space that "
+            "includes a community garden, native plant landscaping, and educational signage about local ecology.")
+REWORDED = ("We're organizing a community-led initiative to turn an abandoned lot into a green space with a "
+            "community garden, native plant landscaping and educational signage about the local ecology.")
+
+
+def test_near_duplicate_index_reuses_reworded_overviews(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_DIR", str(tmp_path))
+    index = MinHashIndex("test")
+    index.add(OVERVIEW, ["Urban Planner"])
+
+    assert index.get(REWORDED) == ["Urban Planner"]
+    assert index.get("Solar panels on the public library roof to cut energy costs.") is None
+    assert index.stats()["hit_rate"] == 0.5
+
+
+def test_near_duplicate_index_expires_and_stays_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_DIR", str(tmp_path))
+    index = MinHashIndex("test", ttl_seconds=60, max_entries=2, evict_every=1)
+    index.add(OVERVIEW, ["Urban Planner"])
+    #a second miss on the same overview doesn't store it twice
+    index.add(OVERVIEW, ["Parks Director"])
+    assert index.get(OVERVIEW) == ["Urban Planner"]
+
+    for text in ("Solar panels on the library roof.", "Bike lanes downtown.", "A river cleanup day."):
+        index.add(text, [text])
+    db = index._db()
+    assert db.execute("SELECT COUNT(*) FROM minhash_entries").fetchone()[0] == 2
+    assert db.execute("SELECT COUNT(DISTINCT entry_id) FROM minhash_bands").fetchone()[0] == 2
+    assert index.get(OVERVIEW) is None
+
+    later = time.time() + 120
+    monkeypatch.setattr(near_duplicates, "time", SimpleNamespace(time=lambda: later))
+    assert index.get("A river cleanup day.") is None
+
+
+def test_job_titles_skip_the_llm_for_near_duplicates(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(job_title, "title_index", MinHashIndex("job_titles"))
+    calls = []
+
+    async def fake_acomplete(stage, messages, **kwargs):
+        calls.append(stage)
+        return '{"job_titles": ["Urban Planner", "Parks Director"]}'
+
+    monkeypatch.setattr(llm_client, "acomplete", fake_acomplete)
+    first = asyncio.run(job_title.get_job_title_list_async(OVERVIEW))
+    second = asyncio.run(job_title.get_job_title_list_async(REWORDED))
+    assert first == second == ["Urban Planner", "Parks Director"]
+    assert calls == ["job_titles"]
+
+
+def test_rejected_overview_never_searches_pdl(people_db, monkeypatch):
+    searched = []
+
+    async def titles(event_summary):
+        return ["urban planner"]
+
+    async def check(event_summary):
+        await asyncio.sleep(0.05)
+        return "Say where the garden is."
+
+    monkeypatch.setattr(pipeline, "get_job_title_list_async", titles)
+    monkeypatch.setattr(pipeline, "description_good_async", check)
+    async def search_page(*args):
+        searched.append(args)
+        return [], None
+
+    monkeypatch.setattr(find_people, "_search_page", search_page)
+    event = ProjectSubmission(project_overview="A garden", location=Location(city="Charlotte", state="NC"))
+
+    async def run():
+        return [update async for update in pipeline.proposal_events(event)]
+
+    assert asyncio.run(run()) == [{"type": "feedback", "feedback": "Say where the garden is."}]
+    assert searched == []
+
+
+def test_rejected_overview_cancels_speculative_titles_at_once(monkeypatch):
+    discarded = []
+
+    async def titles(event_summary):
+        await asyncio.sleep(10)
+
+    async def check(event_summary):
+        return "Say where the garden is."
+
+    monkeypatch.setattr(pipeline, "get_job_title_list_async", titles)
+    monkeypatch.setattr(pipeline, "description_good_async", check)
+    monkeypatch.setattr(pipeline, "_discard", lambda task: discarded.append(task) or task.cancel())
+    event = ProjectSubmission(project_overview="A garden", location=Location(city="Charlotte", state="NC"))
+
+    async def run():
+        result = await pipeline._collect(event)
+        #checked before yielding to the loop, where a garbage-collected generator would be closed
+        return result, list(discarded)
+
+    result, discarded_on_return = asyncio.run(run())
+    assert result == {"feedback": "Say where the garden is."}
+    assert len(discarded_on_return) == 1
@@ -0,0 +1,111 @@
+import asyncio
+import concurrent.futures
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+import pytest
+
+from backend.internal_logic import jobs, storage
+from backend.internal_logic.models import Location, Person, ProjectSubmission
+
+EVENT = ProjectSubmission(project_overview="A community garden", location=Location(city="Charlotte", state="NC"))
+
+
+@pytest.fixture(autouse=True)
+def jobs_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(jobs, "_conn", None)
+
+
+def _dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", ""])
+    process.wait()
+    return process.pid
+
+
+def test_queued_job_survives_a_restart(monkeypatch):
+    job_id = jobs.create_job(EVENT)
+    #a new process opens the database afresh
+    monkeypatch.setattr(jobs, "_conn", None)
+    job = jobs.get_job(job_id)
+    assert job["status"] == jobs.QUEUED
+    assert jobs._claim_next() == (job_id, EVENT.model_dump_json())
+
+
+def test_only_orphaned_running_jobs_are_requeued():
+    orphaned, ours, other_worker = (jobs.create_job(EVENT) for _ in range(3))
+    for job_id, pid in ((orphaned, _dead_pid()), (ours, os.getpid()), (other_worker, os.getppid())):
+        jobs._claim_next()
+        jobs._db().execute("UPDATE jobs SET worker_pid = ? WHERE id = ?", (pid, job_id))
+
+    jobs._requeue_interrupted()
+    assert jobs.get_job(orphaned)["status"] == jobs.QUEUED
+    #a job claimed under this pid belonged to an earlier server that has exited
+    assert jobs.get_job(ours)["status"] == jobs.QUEUED
+    assert jobs.get_job(other_worker)["status"] == jobs.RUNNING
+
+
+def test_workers_sharing_the_queue_cannot_overfill_it(monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_QUEUE_SIZE", 1)
+    jobs._db()
+    #another worker process is halfway through queueing the last free slot
+    other_worker = storage.connect("jobs.sqlite3")
+    other_worker.execute("BEGIN IMMEDIATE")
+    other_worker.execute("INSERT INTO jobs (id, status, request, created_at, updated_at) VALUES ('x', ?, '{}', 0, 0)",
+                         (jobs.QUEUED,))
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        ours = executor.submit(jobs.create_job, EVENT)
+        time.sleep(0.2)
+        other_worker.execute("COMMIT")
+        with pytest.raises(jobs.QueueFull):
+            ours.result()
+
+
+def test_full_queue_answers_503(monkeypatch):
+    from backend.main import app
+
+    monkeypatch.setattr(jobs, "JOB_QUEUE_SIZE", 1)
+    #no workers, so queued jobs stay queued
+    monkeypatch.setattr(jobs, "pool", jobs.JobPool(workers=0))
+
+    async def post_twice():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            payload = EVENT.model_dump()
+            return [await client.post("/api/project/jobs", json=payload) for _ in range(2)]
+
+    accepted, rejected = asyncio.run(post_twice())
+    assert accepted.status_code == 202 and accepted.json()["status"] == jobs.QUEUED
+    assert rejected.status_code == 503 and rejected.headers["retry-after"] == "10"
+
+
+def test_running_job_shows_partial_results(monkeypatch):
+    release = None
+
+    async def events(event, incremental=False):
+        yield {"type": "job_titles", "job_titles": ["urban planner"]}
+        yield {"type": "person", "person": Person(name="Ann")}
+        await release.wait()
+        yield {"type": "person", "person": Person(name="Bo")}
+
+    monkeypatch.setattr(jobs, "proposal_events", events)
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        job_id = jobs.create_job(EVENT)
+        task = asyncio.create_task(jobs.JobPool(workers=0)._run(*jobs._claim_next()))
+        while not (jobs.get_job(job_id)["result"] or {}).get("people_list"):
+            await asyncio.sleep(0.01)
+        partial = jobs.get_job(job_id)
+        release.set()
+        await task
+        return partial, jobs.get_job(job_id)
+
+    partial, finished = asyncio.run(run())
+    assert partial["status"] == jobs.RUNNING
+    assert [person["name"] for person in partial["result"]["people_list"]] == ["Ann"]
+    assert finished["status"] == jobs.DONE
+    assert [person["name"] for person in finished["result"]["people_list"]] == ["Ann", "Bo"]
@@ -0,0 +1,81 @@
+import asyncio
+import json
+import os
+from types import SimpleNamespace
+
+from backend.internal_logic import llm_client, metrics, storage
+
+
+def test_render_histogram_and_counter():
+    latency = metrics.Histogram("test_latency_seconds", "Test latency.", ("stage",), buckets=(0.1, 1.0))
+    calls = metrics.Counter("test_calls_total", "Test calls.", ("stage",))
+    latency.observe(0.05, stage="bio")
+    latency.observe(0.5, stage="bio")
+    calls.inc(stage='say "hi"')
+
+    text = metrics.render()
+    assert '# TYPE plantparty_test_latency_seconds histogram' in text
+    assert 'plantparty_test_latency_seconds_bucket{stage="bio",le="0.1"} 1' in text
+    assert 'plantparty_test_latency_seconds_bucket{stage="bio",le="+Inf"} 2' in text
+    assert 'plantparty_test_latency_seconds_count{stage="bio"} 2' in text
+    assert 'plantparty_test_calls_total{stage="say \\"hi\\""} 1' in text
+
+
+def test_span_records_outcome_and_trace():
+    trace = []
+    try:
+        with metrics.span("test_stage", trace):
+            raise ValueError
+    except ValueError:
+        pass
+    assert trace[0]["stage"] == "test_stage" and trace[0]["outcome"] == "error"
+    assert metrics.STAGE_SECONDS.count(stage="test_stage", outcome="error") == 1
+
+
+def test_acomplete_records_token_usage(monkeypatch):
+    usage = SimpleNamespace(prompt_tokens=1000, completion_tokens=100)
+    completion = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))], usage=usage)
+
+    async def create(**kwargs):
+        return completion
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(llm_client, "get_async_client", lambda: client)
+    monkeypatch.setattr(llm_client, "LLM_CACHE_ENABLED", False)
+
+    asyncio.run(llm_client.acomplete("test_usage", [{"role": "user", "content": "hi"}], model="gpt-4o"))
+    assert llm_client.LLM_TOKENS.value(stage="test_usage", model="gpt-4o", kind="prompt") == 1000
+    assert llm_client.LLM_COST.value(stage="test_usage", model="gpt-4o") == (1000 * 2.50 + 100 * 10.00) / 1e6
+    assert llm_client.LLM_REQUESTS.value(stage="test_usage", source="api") == 1
+
+
+def test_shared_metrics_add_up_every_worker(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(metrics, "METRICS_SHARED", True)
+    calls = metrics.Counter("test_shared_calls_total", "Test calls.", ("stage",))
+    latency = metrics.Histogram("test_shared_seconds", "Test latency.", ("stage",), buckets=(1.0,))
+    limit = metrics.Gauge("test_shared_limit", "Test limit.")
+    calls.inc(2, stage="bio")
+    latency.observe(0.5, stage="bio")
+    limit.set(3)
+
+    #what another worker process left behind
+    (tmp_path / "metrics").mkdir()
+    (tmp_path / "metrics" / "999-dead.json").write_text(json.dumps({
+        calls.name: [[["bio"], 5]], latency.name: [[["bio"], [[1, 1], 2.5]]], limit.name: [[[], 1]],
+    }))
+
+    text = metrics.render()
+    assert 'plantparty_test_shared_calls_total{stage="bio"} 7' in text
+    assert 'plantparty_test_shared_seconds_bucket{stage="bio",le="1"} 2' in text
+    assert 'plantparty_test_shared_seconds_count{stage="bio"} 3' in text
+    assert "plantparty_test_shared_limit 3" in text
+
+    #exited workers are folded into one file; a live worker's file is left alone
+    (tmp_path / "metrics" / f"{os.getppid()}-live.json").write_text(json.dumps({calls.name: [[["bio"], 1]]}))
+    (tmp_path / "metrics" / "998-dead.json").write_text(json.dumps({calls.name: [[["bio"], 10]]}))
+    text = metrics.render()
+    assert 'plantparty_test_shared_calls_total{stage="bio"} 18' in text
+    names = sorted(path.name for path in (tmp_path / "metrics").glob("*.json"))
+    assert names == sorted([f"{os.getppid()}-live.json", "retired.json", os.path.basename(metrics.shared._path())])
+    assert metrics.render() == text
@@ -0,0 +1,135 @@
+import asyncio
+import concurrent.futures
+import time
+
+import httpx
+import pytest
+
+from backend.internal_logic import find_people, person_store, rate_limit, storage
+from backend.internal_logic.models import Location, Person
+
+LOCATION = Location(city="Charlotte", state="NC", postal_code="28227")
+
+
+@pytest.fixture(autouse=True)
+def local_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(person_store, "_conn", None)
+
+
+def test_iter_people_pages_with_scroll_tokens_and_dedupes(monkeypatch):
+    calls = []
+
+    async def fake_page(sql_query, size, scroll_token):
+        start = int(scroll_token or 0)
+        calls.append(size)
+        #every shard returns the same people, so only one copy of each should come out
+        return [Person(name=f"p{i}", linkedin_url=f"u{i}") for i in range(start, start + size)], str(start + size)
+
+    monkeypatch.setattr(find_people, "_search_page", fake_page)
+
+    async def collect():
+        return [p.linkedin_url async for p in find_people.iter_people(
+            ["a", "b", "c"], LOCATION, max_results=12, page_size=4, concurrency=3)]
+
+    urls = asyncio.run(collect())
+    assert len(urls) == len(set(urls))
+    assert sum(calls) == 12  # never asks PDL for more than max_results records
+
+
+def test_build_sql_query_narrows_to_location():
+    query = find_people.build_sql_query(["Urban Planner"], LOCATION)
+    assert "location_postal_code='28227'" in query
+    assert "location_locality='charlotte' AND location_region='north carolina'" in query
+    assert "job_title IN ('Urban Planner')" in query
+
+
+def test_nearest_people_within_radius():
+    person_store.save_people([
+        Person(name="uptown", linkedin_url="u1", current_job_title="urban planner", coordinates=(35.2271, -80.8431)),
+        Person(name="matthews", linkedin_url="u2", current_job_title="urban planner", coordinates=(35.1168, -80.7237)),
+        Person(name="raleigh", linkedin_url="u3", current_job_title="urban planner", coordinates=(35.7796, -78.6382)),
+        Person(name="no geo", linkedin_url="u4", current_job_title="urban planner"),
+    ])
+    nearby = person_store.nearest(35.2271, -80.8431, radius_km=50, job_titles=["Urban Planner"])
+    assert [p.name for p in nearby] == ["uptown", "matthews"]
+    assert nearby[0].coordinates == (35.2271, -80.8431)
+
+
+def test_parse_people_decodes_projected_records():
+    today = find_people.date.today()
+    records = [{
+        "full_name": "ann lee",
+        "location_geo": "35.2271,-80.8431",
+        "linkedin_username": "annlee",
+        "skills": None,
+        "experience": [
+            {"is_primary": True, "title": {"name": "urban planner"}, "company": {"name": "city of charlotte"}},
+            {"title": {"name": "intern"}, "end_date": f"{today.year - 1}-01"},
+            {"title": {"name": "clerk"}, "end_date": "1990"},
+            {"title": {"name": "unknown"}, "end_date": "not a date"},
+        ],
+    }, {"full_name": "no jobs"}]
+
+    ann, other = find_people.parse_people(records)
+    assert ann.current_job_title == "urban planner" and ann.company_name == "city of charlotte"
+    assert ann.skills == [] and ann.coordinates == (35.2271, -80.8431)
+    assert [title for title, _ in ann.past_job_title] == ["intern"]
+    assert other.current_job_title == "" and other.past_job_title == []
+    assert not hasattr(ann, "__dict__")
+    assert ann.linkedin_url == "https://linkedin.com/in/annlee" and other.linkedin_url is None
+
+
+def test_people_without_linkedin_are_kept_apart(monkeypatch):
+    async def fake_page(sql_query, size, scroll_token):
+        return [Person(name="ann", company_name="city"), Person(name="bo", company_name="city"),
+                Person(name="ann", company_name="city")], None
+
+    monkeypatch.setattr(find_people, "_search_page", fake_page)
+
+    async def collect():
+        return [p.name async for p in find_people.iter_people(["a"], LOCATION, max_results=10)]
+
+    assert asyncio.run(collect()) == ["ann", "bo"]
+
+
+def test_failed_search_is_not_cached(monkeypatch):
+    calls = []
+
+    async def failing_page(sql_query, size, scroll_token):
+        calls.append(size)
+        raise find_people.PDLSearchError("connection refused")
+
+    monkeypatch.setattr(find_people, "_search_page", failing_page)
+    search = lambda: asyncio.run(find_people.find_people_async(["Urban Planner"], LOCATION, offline=False))
+    assert search() == [] and search() == []
+    assert len(calls) == 2
+
+
+def test_pdl_backoff_leaves_executor_threads_free(monkeypatch):
+    posts = []
+
+    def post(path, body):
+        posts.append(body)
+        if len(posts) == 1:
+            request = httpx.Request("POST", path)
+            raise httpx.HTTPStatusError("busy", request=request,
+                                        response=httpx.Response(429, headers={"retry-after": "0.3"}, request=request))
+        return {"status": 404}
+
+    monkeypatch.setattr(find_people, "_post", post)
+    monkeypatch.setattr(rate_limit, "_limiters", {})
+
+    async def run():
+        #one thread, so a search sleeping in it would hold up everyone else's to_thread
+        asyncio.get_running_loop().set_default_executor(concurrent.futures.ThreadPoolExecutor(max_workers=1))
+        search = asyncio.create_task(find_people._search_page("sql", 10, None))
+        while not posts:
+            await asyncio.sleep(0.01)
+        start = time.monotonic()
+        await asyncio.to_thread(lambda: None)
+        return time.monotonic() - start, await search
+
+    waited, page = asyncio.run(run())
+    assert waited < 0.2
+    assert page == ([], None) and len(posts) == 2
@@ -0,0 +1,95 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from backend.internal_logic import rate_limit, storage
+from backend.internal_logic.rate_limit import BACKGROUND, INTERACTIVE, RateLimiter
+
+
+def _status_error(status: int, headers: dict | None = None) -> httpx.HTTPStatusError:
+    request = httpx.Request("POST", "http://api.test")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    return httpx.HTTPStatusError("failed", request=request, response=response)
+
+
+def test_requests_per_minute_limit_spaces_out_calls():
+    limiter = RateLimiter("test", requests_per_minute=600)  # 10/s, bucket starts full
+    limiter.requests.level = 0
+    start = time.monotonic()
+    for _ in range(3):
+        limiter.acquire_sync()
+    assert time.monotonic() - start >= 0.25
+
+
+def test_interactive_calls_go_before_background():
+    limiter = RateLimiter("test", requests_per_minute=600)
+    limiter.requests.level = 0
+    order = []
+
+    async def call(name: str, level: int, delay: float):
+        await asyncio.sleep(delay)
+        rate_limit.priority.set(level)
+        await limiter.acquire()
+        order.append(name)
+
+    async def run():
+        #both background calls are queued before the interactive one arrives
+        await asyncio.gather(call("background 1", BACKGROUND, 0), call("background 2", BACKGROUND, 0),
+                             call("interactive", INTERACTIVE, 0.01))
+
+    asyncio.run(run())
+    assert order[0] == "interactive"
+
+
+def test_retries_with_retry_after_and_pauses_everyone(monkeypatch):
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_MAX_RETRIES", 2)
+    limiter = RateLimiter("test", requests_per_minute=0)
+    attempts = []
+
+    def call():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise _status_error(429, {"retry-after": "0.2"})
+        return "ok"
+
+    assert limiter.run_sync(call) == "ok"
+    assert attempts[1] - attempts[0] >= 0.2
+    assert limiter.blocked_until > 0
+
+
+def test_does_not_retry_client_errors():
+    limiter = RateLimiter("test", requests_per_minute=0)
+    attempts = []
+
+    def call():
+        attempts.append(1)
+        raise _status_error(400)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        limiter.run_sync(call)
+    assert len(attempts) == 1
+
+
+
+def test_shared_limiters_draw_on_one_budget(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(rate_limit, "_shared_conn", None)
+    #the same limiter as seen from two worker processes
+    first = RateLimiter("test", requests_per_minute=4, shared=True, name="test:shared")
+    second = RateLimiter("test", requests_per_minute=4, shared=True, name="test:shared")
+
+    for limiter in (first, second, first):
+        limiter.acquire_sync()
+    asyncio.run(second.acquire())
+    entry = second._enqueue()
+    assert second._try_take(entry, 0) > 10
+    second._leave(entry)
+
+    #a 429 seen by one pauses the other
+    other = RateLimiter("test", requests_per_minute=0, shared=True, name="test:blocked")
+    RateLimiter("test", requests_per_minute=0, shared=True, name="test:blocked").backoff(
+        _status_error(429, {"retry-after": "20"}), 0)
+    entry = other._enqueue()
+    assert other._try_take(entry, 0) > 15
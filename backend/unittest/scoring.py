@@ -0,0 +1,113 @@
+import asyncio
+
+from backend.internal_logic import (check_description, combined_enrichment, enrichment, llm_client, prerank,
+                                    relevance_score)
+from backend.internal_logic.models import DescriptionCheck, Person, RelevanceScores
+from backend.internal_logic.prompt_context import PROMPT_TOKENS, person_context
+from backend.internal_logic.tokens import estimate_tokens
+
+
+def test_batch_scores_parse_and_clamp():
+    content = '{"scores": [{"id": 2, "score": "150"}, {"id": 1, "score": 40}, {"id": 9, "score": 1}]}'
+    assert relevance_score._parse_scores(content, 3) == [40, 100, None]
+    assert relevance_score._parse_scores("not json", 2) == [None, None]
+
+
+def test_batch_scores_split_on_token_budget():
+    bios = ["word " * 500] * 5
+    chunks = relevance_score._chunks("A community garden", bios, budget=1500)
+    assert [i for chunk in chunks for i in chunk] == list(range(5))
+    assert len(chunks) > 1
+    assert relevance_score._chunks("A community garden", ["short bio"] * 5) == [[0, 1, 2, 3, 4]]
+
+
+def test_prerank_keeps_best_matches():
+    people = [
+        Person(name="chef", current_job_title="line cook", skills=["cooking"]),
+        Person(name="planner", current_job_title="sustainability coordinator", skills=["community gardens"]),
+        Person(name="accountant", current_job_title="accountant", interests=["golf"]),
+    ]
+    ranked = prerank.rank_people(people, "A sustainable community garden downtown", top_k=2)
+    assert [p.name for p in ranked][0] == "planner"
+    assert len(ranked) == 2
+
+
+def test_description_fast_path_accepts_detailed_summaries_only():
+    detailed = (
+        "This project aims to develop a self-sustaining urban rooftop garden in the downtown area, spanning 50 "
+        "square feet. It will utilize hydroponic systems to maximize crop yield and implement a rainwater "
+        "collection system for irrigation. Additionally, the garden will serve as a community engagement hub, "
+        "hosting educational workshops on sustainable agriculture and providing fresh produce to local food banks."
+    )
+    assert check_description.quick_check(detailed)
+    assert not check_description.quick_check("A super awesome community garden 20sq ft")
+    assert not check_description.quick_check("Starting a green initiative. Need help.")
+
+    before = check_description.description_stats["heuristic"]
+    assert check_description.description_good(detailed) is None
+    assert check_description.description_stats["heuristic"] == before + 1
+
+
+def test_person_context_keeps_relevant_details_within_budget():
+    person = Person(name="Ann", current_job_title="parks director",
+                    skills=[f"filler skill {i}" for i in range(40)] + ["community gardens"],
+                    interests=["golf", "urban farming"], past_job_title=[("volunteer coordinator", 400)])
+    overview = "A community garden run by volunteers"
+
+    full = person_context(person, overview, stage="test", budget=0)
+    trimmed = person_context(person, overview, stage="test", budget=80)
+    assert estimate_tokens(trimmed) <= 80 < estimate_tokens(full)
+    assert "community gardens" in trimmed and "volunteer coordinator (ended 1 year ago)" in trimmed
+    assert "Name: Ann" in trimmed and "filler skill 39" not in trimmed
+    assert PROMPT_TOKENS.value(stage="test", kind="saved") == estimate_tokens(full) - estimate_tokens(trimmed)
+
+
+def test_combined_enrichment_parse():
+    parsed = combined_enrichment.parse_combined('{"bio": " - helps ", "score": "250", "email_draft": ""}')
+    assert parsed == {"bio": "- helps", "score": 100}
+    assert combined_enrichment.parse_combined("not json") == {}
+
+
+def test_combined_mode_falls_back_for_missing_fields(monkeypatch):
+    calls = []
+
+    async def fake_acomplete(stage, messages, **kwargs):
+        calls.append(stage)
+        return '{"bio": "- runs the county garden program", "score": null, "email_draft": null}'
+
+    async def fake_score(person, event_summary):
+        calls.append("relevance_score")
+        person.score = 42
+
+    monkeypatch.setattr(combined_enrichment, "acomplete", fake_acomplete)
+    monkeypatch.setattr(enrichment, "make_score_async", fake_score)
+    person = Person(name="Ann", linkedin_url="u-combined")
+
+    asyncio.run(enrichment.enrich_people([person], "community garden", with_email=False, mode="combined"))
+    assert person.bio == "- runs the county garden program" and person.score == 42
+    assert calls == ["combined_enrichment", "relevance_score"]
+
+
+def test_structured_outputs_retry_once_then_give_up(monkeypatch):
+    answers = {"relevance_score": ["57", '{"score": 250}'], "check_description": ["nope", "still nope"]}
+    refreshes = []
+
+    async def fake_acomplete(stage, messages, model, temperature, refresh=False, **params):
+        assert params["response_format"]["json_schema"]["strict"]
+        refreshes.append(refresh)
+        return answers[stage].pop(0)
+
+    monkeypatch.setattr(llm_client, "acomplete", fake_acomplete)
+    assert asyncio.run(relevance_score.get_relevance_score_async("garden", "- bio")) == 100
+    assert refreshes == [False, True]
+    #an unusable check lets the summary through rather than blocking the user
+    assert asyncio.run(check_description.check_description_async("garden")) is None
+    assert check_description._feedback(None) is None
+    assert check_description._feedback(DescriptionCheck(enough_detail=False, feedback=" Say where. ")) == "Say where."
+
+
+def test_strict_response_format_requires_every_property():
+    schema = llm_client.response_format(RelevanceScores)["json_schema"]["schema"]
+    assert schema["required"] == ["scores"] and schema["additionalProperties"] is False
+    entry = schema["$defs"]["CandidateScore"]
+    assert entry["required"] == ["id", "score"] and entry["additionalProperties"] is False
@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+
+#cumulative `python -X importtime` budget for the app module, in milliseconds
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "1500"))
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+#import must work with no keys and nothing reachable
+OFFLINE_ENV = {**os.environ, "OPENAI_API_KEY": "", "PDL_API_KEY": "", "OPENAI_BASE_URL": "http://127.0.0.1:9"}
+
+
+def import_time_ms(module: str) -> float:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, env=OFFLINE_ENV, capture_output=True, text=True, check=True,
+    )
+    for line in result.stderr.splitlines():
+        #"import time:  self [us] | cumulative | imported package"
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1]) / 1000
+    raise AssertionError(f"{module} not found in importtime output")
+
+
+def test_backend_main_import_budget():
+    #best of a few runs, the first one may still be writing .pyc files
+    best = min(import_time_ms("backend.main") for _ in range(3))
+    print(f"backend.main imports in {best:.0f} ms (budget {STARTUP_BUDGET_MS:.0f} ms)")
+    assert best <= STARTUP_BUDGET_MS
+
+
+def test_backend_main_import_has_no_side_effects():
+    code = (
+        "import sys, backend.main\n"
+        "loaded = [m for m in ('openai', 'peopledatalabs', 'tkinter', 'idlelib') if m in sys.modules]\n"
+        "assert not loaded, loaded\n"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, env=OFFLINE_ENV, check=True)
+
+
+def test_backend_main_import_leaves_data_dir_alone(tmp_path):
+    #gunicorn preloads the app and forks it, so importing must not open databases, files or threads
+    data_dir = tmp_path / "data"
+    subprocess.run(
+        [sys.executable, "-c", "import threading, backend.main; assert threading.active_count() == 1"],
+        cwd=REPO_ROOT, env={**OFFLINE_ENV, "DATA_DIR": str(data_dir)}, check=True,
+    )
+    assert not data_dir.exists()
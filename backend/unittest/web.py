@@ -1,8 +1,11 @@
+import json
+
 import pytest
 from fastapi.testclient import TestClient
 from fastapi import FastAPI
 
-from backend.external_logic.user_event import router
+from backend.external_logic.user_event import PUBLIC_PERSON_FIELDS, router
+from backend.internal_logic.models import Person
 
 # Create a test FastAPI app instance
 app = FastAPI()
@@ -61,4 +64,74 @@ def test_submit_verbose_location():
     data = response.json()
     print(data)
 
-    assert isinstance(data["people_list"], list)
\ No newline at end of file
+    assert isinstance(data["people_list"], list)
+
+STREAM_PAYLOAD = {"project_overview": "A community garden", "location": {"city": "Charlotte", "state": "NC"}}
+
+
+def _stream_lines(monkeypatch, events):
+    from backend.external_logic import user_event
+    monkeypatch.setattr(user_event, "proposal_events", events)
+    response = client.post("/project/proposal/stream", json=STREAM_PAYLOAD)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_stream_sends_each_person_then_done(monkeypatch):
+    async def events(event, incremental=False):
+        assert incremental
+        yield {"type": "job_titles", "job_titles": ["urban planner"]}
+        yield {"type": "candidates", "count": 1}
+        yield {"type": "person", "person": Person(name="Ann", score=80, current_job_title="planner")}
+
+    lines = _stream_lines(monkeypatch, events)
+    assert [line["type"] for line in lines] == ["job_titles", "candidates", "person", "done"]
+    #only the public fields leave the server
+    assert set(lines[2]["person"]) == set(PUBLIC_PERSON_FIELDS)
+    assert lines[2]["person"]["name"] == "Ann"
+
+
+def test_stream_reports_a_failure_instead_of_done(monkeypatch):
+    async def events(event, incremental=False):
+        yield {"type": "person", "person": Person(name="Ann")}
+        raise RuntimeError("PDL is down")
+
+    lines = _stream_lines(monkeypatch, events)
+    assert [line["type"] for line in lines] == ["person", "error"]
+    assert "PDL" not in lines[-1]["error"]
+
+
+def test_email_for_a_person_without_linkedin(monkeypatch):
+    from backend.external_logic import user_event
+    drafted = []
+
+    async def make_email(person, project_overview):
+        drafted.append(person)
+        return f"Dear {person.name}"
+
+    monkeypatch.setattr(user_event, "make_email_async", make_email)
+    response = client.post("/project/email", json={
+        "project_overview": "A community garden", "linkedin_url": None, "bio": "- Plans parks",
+        "name": "Ann", "current_job_title": "urban planner", "company_name": "city of charlotte",
+    })
+    assert response.status_code == 200 and response.json() == {"email_draft": "Dear Ann"}
+    assert drafted[0].company_name == "city of charlotte" and drafted[0].bio == "- Plans parks"
+
+    assert client.post("/project/email", json={"project_overview": "A community garden"}).status_code == 404
+
+
+def test_email_stream_reports_a_failure(monkeypatch):
+    from backend.external_logic import user_event
+
+    async def stream_email(person, project_overview):
+        yield "Dear Ann,"
+        raise RuntimeError("OpenAI is down")
+
+    monkeypatch.setattr(user_event, "stream_email_async", stream_email)
+    response = client.post("/project/email", json={
+        "project_overview": "A community garden", "bio": "- Plans parks", "name": "Ann", "stream": True,
+    })
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines == [{"type": "text", "text": "Dear Ann,"},
+                     {"type": "error", "error": "Email draft failed, please try again."}]
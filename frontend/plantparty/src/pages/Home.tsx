@@ -25,7 +25,7 @@ import ContentCopyIcon from '@mui/icons-material/ContentCopy';
 import { motion } from 'framer-motion';
 import Markdown from 'markdown-to-jsx';
 import LinkedInAuth from '../components/LinkedInAuth';
-import { submitProjectProposal } from '../services/api';
+import { generateEmailDraft, streamProjectProposal, PersonInfo } from '../services/api';
 
 interface Person {
   id: string;
@@ -38,6 +38,8 @@ interface Person {
   suggestedMessage: string;
   isConnected?: boolean;
   matchScore: number;
+  // the person as the server sent them, echoed back when drafting their email
+  profile?: PersonInfo;
 }
 
 const mockPeople: Person[] = [
@@ -65,6 +67,8 @@ const mockPeople: Person[] = [
   },
 ];
 
+const DEFAULT_MESSAGE = 'Hello, I would like to connect regarding a sustainability project.';
+
 const Home = () => {
   const [idea, setIdea] = useState('');
   
@@ -73,6 +77,7 @@ const Home = () => {
   const [selectedPlace, setSelectedPlace] = useState<any>(null);
 
   const [isSubmitting, setIsSubmitting] = useState(false);
+  const [progress, setProgress] = useState<{ found: number; total: number } | null>(null);
   const [submitStatus, setSubmitStatus] = useState<string | null>(null);
   const [selectedPerson, setSelectedPerson] = useState<Person | null>(null);
   const [messageEdit, setMessageEdit] = useState('');
@@ -203,29 +208,53 @@ const Home = () => {
         },
       };
 
-      const response = await submitProjectProposal(proposal);
-      
-      // Check if response contains feedback
-      if ('feedback' in response) {
-        setSubmitStatus(response.feedback);
-        setPeople([]);
-      } else {
-        // Handle people list response
-        setSubmitStatus('Project proposal submitted successfully!');
-        const transformedPeople = response.people_list.map((person, index) => ({
-          id: index.toString(),
-          name: person.name,
-          role: person.current_job_title || 'Professional',
-          organization: person.company_name || 'Organization',
-          location: person.location || 'Location not specified',
-          bio: person.bio || '',
-          linkedinUrl: person.linkedin_url || '#',
-          suggestedMessage: person.email_draft || 'Hello, I would like to connect regarding a sustainability project.',
-          matchScore: person.score || 0,
-        }));
-        setPeople(transformedPeople);
+      // People arrive one at a time as they are scored, so show each as soon as it is ready
+      setPeople([]);
+      setProgress(null);
+      let finished = false;
+      await streamProjectProposal(proposal, (event) => {
+        switch (event.type) {
+          case 'feedback':
+            setSubmitStatus(event.feedback);
+            break;
+          case 'candidates':
+            setProgress({ found: 0, total: event.count });
+            break;
+          case 'person': {
+            const person = event.person;
+            setProgress(prev => (prev ? { ...prev, found: prev.found + 1 } : prev));
+            setPeople(prevPeople =>
+              [
+                ...prevPeople,
+                {
+                  id: prevPeople.length.toString(),
+                  name: person.name,
+                  role: person.current_job_title || 'Professional',
+                  organization: person.company_name || 'Organization',
+                  location: person.location || 'Location not specified',
+                  bio: person.bio || '',
+                  linkedinUrl: person.linkedin_url || '#',
+                  suggestedMessage: person.email_draft || '',
+                  matchScore: person.score || 0,
+                  profile: person,
+                },
+              ].sort((a, b) => b.matchScore - a.matchScore)
+            );
+            break;
+          }
+          case 'error':
+            throw new Error(event.error);
+          case 'done':
+            finished = true;
+            setSubmitStatus(prev => prev ?? 'Project proposal submitted successfully!');
+            break;
+        }
+      });
+      // A stream cut off before 'done' is a failure, not an empty result
+      if (!finished) {
+        throw new Error('Proposal stream ended early');
       }
-      
+
       // Start cooldown
       setIsCooldown(true);
       setTimeout(() => {
@@ -237,6 +266,7 @@ const Home = () => {
       setSubmitStatus('Failed to submit project proposal. Please try again.');
     } finally {
       setIsSubmitting(false);
+      setProgress(null);
     }
   };
 
@@ -287,10 +317,32 @@ const Home = () => {
   };
 
   // Handler for opening the dialog and prepping the message
-  const handlePersonClick = (person: Person) => {
+  const handlePersonClick = async (person: Person) => {
     setSelectedPerson(person);
     setMessageEdit(person.suggestedMessage);
     setEditRequest('');
+
+    if (person.suggestedMessage) return;
+    // Draft the email only for the person the user opens
+    let draft = DEFAULT_MESSAGE;
+    try {
+      draft = await generateEmailDraft({
+        project_overview: idea,
+        linkedin_url: person.profile ? person.profile.linkedin_url : person.linkedinUrl,
+        bio: person.bio,
+        name: person.name,
+        current_job_title: person.profile?.current_job_title,
+        company_name: person.profile?.company_name,
+        location: person.profile?.location,
+      });
+    } catch (error) {
+      console.error('Error generating email draft:', error);
+    }
+    setPeople(prevPeople =>
+      prevPeople.map(p => (p.id === person.id ? { ...p, suggestedMessage: draft } : p))
+    );
+    setSelectedPerson(prev => (prev && prev.id === person.id ? { ...prev, suggestedMessage: draft } : prev));
+    setMessageEdit(prev => prev || draft);
   };
 
   const getMatchColor = (score: number) => {
@@ -383,7 +435,9 @@ const Home = () => {
           disabled={isSubmitting || isCooldown}
           startIcon={isSubmitting ? <CircularProgress size={20} /> : <SendIcon />}
         >
-          {isSubmitting ? 'Growing...' : isCooldown ? 'Please wait...' : 'Grow My Idea'}
+          {isSubmitting
+            ? progress ? `Growing... (${progress.found}/${progress.total})` : 'Growing...'
+            : isCooldown ? 'Please wait...' : 'Grow My Idea'}
         </Button>
       </Box>
 
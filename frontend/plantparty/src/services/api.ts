@@ -16,9 +16,11 @@ interface Location {
 interface ProjectProposal {
   project_overview: string;
   location: Location;
+  // bio/score/email as separate calls or one combined call per person (server default if unset)
+  enrichment?: 'separate' | 'combined';
 }
 
-interface PersonInfo {
+export interface PersonInfo {
   name: string;
   score?: number;
   email_draft?: string;
@@ -40,6 +42,17 @@ interface FeedbackResponse {
 
 type ApiResponse = PeopleListResponse | FeedbackResponse;
 
+interface EmailDraftRequest {
+  project_overview: string;
+  linkedin_url?: string;
+  bio?: string;
+  // the profile as the proposal returned it, for people the server has no LinkedIn record of
+  name?: string;
+  current_job_title?: string;
+  company_name?: string;
+  location?: string;
+}
+
 const api = axios.create({
   baseURL: 'http://0.0.0.0:8001', // Backend API URL
 });
@@ -52,4 +65,53 @@ export const submitProjectProposal = async (proposal: ProjectProposal): Promise<
     console.error('Error submitting project proposal:', error);
     throw error;
   }
-}; 
\ No newline at end of file
+}; 
+
+// Email drafts are generated on demand, for the person the user actually wants to contact.
+export const generateEmailDraft = async (request: EmailDraftRequest): Promise<string> => {
+  try {
+    const response = await api.post('/api/project/email', request);
+    return response.data.email_draft;
+  } catch (error) {
+    console.error('Error generating email draft:', error);
+    throw error;
+  }
+};
+
+export type ProposalStreamEvent =
+  | { type: 'feedback'; feedback: string }
+  | { type: 'job_titles'; job_titles: string[] }
+  | { type: 'candidates'; count: number }
+  | { type: 'person'; person: PersonInfo }
+  | { type: 'error'; error: string }
+  | { type: 'done' };
+
+// Streams proposal results (newline-delimited JSON), calling onEvent as each one arrives.
+export const streamProjectProposal = async (
+  proposal: ProjectProposal,
+  onEvent: (event: ProposalStreamEvent) => void,
+): Promise<void> => {
+  const response = await fetch(`${api.defaults.baseURL}/api/project/proposal/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(proposal),
+  });
+  if (!response.ok || !response.body) {
+    throw new Error(`Proposal stream failed with status ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffered += decoder.decode(value, { stream: true });
+    const lines = buffered.split('\n');
+    buffered = lines.pop() ?? '';
+    lines.filter((line) => line.trim()).forEach((line) => onEvent(JSON.parse(line)));
+  }
+  if (buffered.trim()) {
+    onEvent(JSON.parse(buffered));
+  }
+};